@@ -1,25 +1,40 @@
 import os
 import sys
-import json
-import pandas as pd
-import difflib
-import xml.etree.ElementTree as ET
 import platform 
+import multiprocessing
+import html
+import time
+import difflib
+import functools
+import inspect
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QLabel, QFileDialog, 
-                             QTreeWidget, QTreeWidgetItem, QSpinBox, QGroupBox, 
+                             QTreeView, QSpinBox, QGroupBox, 
                              QMessageBox, QLineEdit, QMenu, QCheckBox, QDialog,
-                             QTableWidget, QTableWidgetItem, QHeaderView, QInputDialog,
-                             QStyle, QProgressDialog) 
-from PyQt6.QtCore import Qt, QSettings
-from PyQt6.QtGui import QAction, QColor, QBrush, QFont, QIcon
-
-# ================= 修复 1: 解除递归限制 =================
-sys.setrecursionlimit(20000) 
-# ========================================================
+                             QTableView, QAbstractItemView, QHeaderView, QInputDialog, QComboBox, QDoubleSpinBox,
+                             QStyle, QProgressDialog, QListWidget, QListWidgetItem, QStyledItemDelegate, QToolButton) 
+from PyQt6.QtCore import Qt, QSettings, QAbstractItemModel, QAbstractTableModel, QModelIndex, pyqtSignal, QObject, QThread, QTimer, QFileSystemWatcher
+from PyQt6.QtGui import QAction, QColor, QBrush, QFont, QIcon, QTextDocument
+from category_core import CategoryStore, ROOT
+from category_search import SearchIndex
+from category_index import PathIndex, code_prefix
+from category_ops import read_rules, scan_matches, apply_codes
+from category_export import export_catalog, format_of, FORMATS, ExportCancelled
+from category_opml import load_opml, OpmlCancelled
+from category_project import (parse_project, save_project_file, PROJECT_EXT, ChangeJournal, JournalMismatch,
+                              journal_path, replay_journal, data_fingerprint)
+from category_sync import compute_hashes, merge_remote, diff_ops, StoreApplier
+from category_profile import PROFILER, summary as profile_summary
 
 DEFAULT_OPML_FILE = "Homedepot 后台类目路径.opml" 
+PROJECT_FILTER = f"项目文件 (*{PROJECT_EXT});;JSON (*.json)"
 ROLE_IS_FOLDER = Qt.ItemDataRole.UserRole + 1 
+SEARCH_DEBOUNCE_MS = 150   # 输入停顿多久后才发起搜索
+SEARCH_LIMIT = 30
+AUTOSAVE_MS = 3000            # 修改日志落盘间隔
+JOURNAL_HINT_OPS = 2000       # 日志每累计这么多条在状态栏提醒一次保存 (只有手动保存才并回快照)
+SYNC_DELAY_MS = 800           # 项目文件变化后等这么久再合并 (同事那边可能还在连续保存)
+PROFILE_REFRESH_MS = 500      # 性能分析开启时状态栏摘要的刷新间隔
 
 # ================= 修复 2: 高清马卡龙色系 =================
 COLOR_PALETTE = [
@@ -28,53 +43,359 @@ COLOR_PALETTE = [
 ]
 # ========================================================
 
+class MatchTableModel(QAbstractTableModel):
+    """模糊匹配审核表：一条匹配一行，只在视图取数据时才生成该行的差异高亮 (并缓存)；
+    勾选状态按匹配下标存放，筛选/排序只重排可见下标列表"""
+    HEADERS = ["选择", "错误类型", "相似度", "路径对比 (上:OCR / 下:CSV)", "应用编码"]
+    checkedChanged = pyqtSignal()
+    def __init__(self, matches, fonts, parent=None):
+        super().__init__(parent)
+        self.matches = matches; self.checked = bytearray(b'\x01') * len(matches); self.rows = list(range(len(matches)))
+        self.font_mono, self.font_bold = fonts; self._html = {}
+        self.type_filter = None; self.min_score = 0.0; self.sort_key = None; self.sort_order = Qt.SortOrder.DescendingOrder
+        self.brush_cut = QBrush(QColor("purple")); self.brush_code = QBrush(QColor("blue"))
+
+    def rowCount(self, parent=QModelIndex()): return 0 if parent.isValid() else len(self.rows)
+    def columnCount(self, parent=QModelIndex()): return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole: return self.HEADERS[section]
+        return None
+
+    def diff_html(self, i):
+        """OCR 路径与 CSV 路径的字符级差异：上行橙色标出多出/错的字，下行绿色标出应有的字"""
+        h = self._html.get(i)
+        if h is None:
+            m = self.matches[i]; a, b = m['full_path'], m['csv_path']; top, bottom = [], []
+            for op, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+                x, y = html.escape(a[i1:i2]), html.escape(b[j1:j2])
+                if op == "equal": top.append(x); bottom.append(y); continue
+                if x: top.append(f"<b style='color:#D84315;background:#FFE0B2'>{x}</b>")
+                if y: bottom.append(f"<b style='color:#2E7D32;background:#C8E6C9'>{y}</b>")
+            h = self._html[i] = (f"<div style='background:#FFF3E0'>🔴 识别: {''.join(top)}</div>"
+                                 f"<div style='background:#E8F5E9'>🟢 标准: {''.join(bottom)}</div>")
+        return h
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        i = self.rows[index.row()]; m = self.matches[i]; col = index.column()
+        if col == 0: return (Qt.CheckState.Checked if self.checked[i] else Qt.CheckState.Unchecked) if role == Qt.ItemDataRole.CheckStateRole else None
+        if role == Qt.ItemDataRole.DisplayRole:
+            if col == 1: return m['match_type']
+            if col == 2: return f"{m.get('score', 0):.0%}"
+            if col == 3: return self.diff_html(i)
+            return m['code']
+        if role == Qt.ItemDataRole.ToolTipRole and col == 3: return f"{m['full_path']}\n{m['csv_path']}"
+        if role == Qt.ItemDataRole.ToolTipRole and col == 2: return "叶子名相似度" + ("" if m.get('same_parent', True) else "，父路径不同")
+        if role == Qt.ItemDataRole.FontRole: return self.font_mono if col == 3 else self.font_bold if col in (1, 4) else None
+        if role == Qt.ItemDataRole.ForegroundRole: return self.brush_code if col == 4 else self.brush_cut if col == 1 and "截断" in m['match_type'] else None
+        if role == Qt.ItemDataRole.TextAlignmentRole and col != 3: return Qt.AlignmentFlag.AlignCenter
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.CheckStateRole or index.column() != 0: return False
+        self.checked[self.rows[index.row()]] = 1 if Qt.CheckState(value) == Qt.CheckState.Checked else 0
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.CheckStateRole]); self.checkedChanged.emit()
+        return True
+
+    def flags(self, index):
+        if not index.isValid(): return Qt.ItemFlag.NoItemFlags
+        f = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        return f | Qt.ItemFlag.ItemIsUserCheckable if index.column() == 0 else f
+
+    def _keys(self, column):
+        m = self.matches
+        if column == 0: return lambda i: self.checked[i]
+        if column == 1: return lambda i: m[i]['match_type']
+        if column == 2: return lambda i: m[i].get('score', 0)
+        if column == 4: return lambda i: m[i]['code']
+        return lambda i: m[i]['full_path']
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self.sort_key = column; self.sort_order = order; self.refilter()
+
+    def set_filter(self, match_type=None, min_score=0.0):
+        self.type_filter = match_type; self.min_score = min_score; self.refilter()
+
+    def refilter(self):
+        m = self.matches; t = self.type_filter; lo = self.min_score
+        self.beginResetModel()
+        self.rows = [i for i in range(len(m)) if (t is None or m[i]['match_type'] == t) and m[i].get('score', 0) >= lo]
+        if self.sort_key is not None: self.rows.sort(key=self._keys(self.sort_key), reverse=self.sort_order == Qt.SortOrder.DescendingOrder)
+        self.endResetModel()
+
+    def set_checked_visible(self, on):
+        """批量勾选/取消当前筛选出的全部行"""
+        v = 1 if on else 0
+        for i in self.rows: self.checked[i] = v
+        if self.rows: self.dataChanged.emit(self.index(0, 0), self.index(len(self.rows) - 1, 0), [Qt.ItemDataRole.CheckStateRole])
+        self.checkedChanged.emit()
+
+    def checked_matches(self): return [m for m, c in zip(self.matches, self.checked) if c]
+
+
 class MatchReviewDialog(QDialog):
-    """审核对话框"""
+    """审核对话框：虚拟化表格，可按类型/相似度筛选、按列排序、批量勾选"""
     def __init__(self, fuzzy_matches, parent=None):
         super().__init__(parent)
         self.setWindowTitle(f"📷 智能路径修复 - 共 {len(fuzzy_matches)} 条待确认")
         self.resize(1100, 750) 
         self.result_list = [] 
+        self.fuzzy_matches = fuzzy_matches
         layout = QVBoxLayout(self)
-        lbl = QLabel("请对比路径差异：(上方橙色为识别结果，下方绿色为标准结果)")
+        lbl = QLabel("请对比路径差异：(上方橙色为识别结果，下方绿色为标准结果，差异字符加粗标出)")
         font = QFont(); font.setBold(True)
         if platform.system() == "Windows": font.setFamily("Microsoft YaHei UI"); font.setPointSize(10)
         else: font.setPointSize(12) 
         lbl.setFont(font); lbl.setStyleSheet("color: #E65100; margin-bottom: 10px; background-color: transparent;")
         layout.addWidget(lbl)
-        self.table = QTableWidget(); self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(["选择", "错误类型", "路径对比 (上:OCR / 下:CSV)", "应用编码"])
-        header = self.table.horizontalHeader()
-        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Fixed); self.table.setColumnWidth(0, 60) 
-        header.setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
-        header.setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch) 
-        header.setSectionResizeMode(3, QHeaderView.ResizeMode.ResizeToContents)
-        self.table.verticalHeader().setDefaultSectionSize(45)
-        self.fuzzy_matches = fuzzy_matches
-        self.table.setRowCount(len(fuzzy_matches) * 2)
         font_mono = QFont("Menlo" if platform.system() == "Darwin" else "Consolas", 10) 
         font_bold = QFont(); font_bold.setBold(True); 
         if platform.system() == "Windows": font_bold.setFamily("Microsoft YaHei UI")
-        for i, match in enumerate(fuzzy_matches):
-            row_top = i * 2; row_bottom = i * 2 + 1
-            item_check = QTableWidgetItem(); item_check.setFlags(Qt.ItemFlag.ItemIsUserCheckable | Qt.ItemFlag.ItemIsEnabled); item_check.setCheckState(Qt.CheckState.Checked); self.table.setItem(row_top, 0, item_check); self.table.setSpan(row_top, 0, 2, 1) 
-            type_text = match['match_type']; item_type = QTableWidgetItem(type_text); item_type.setTextAlignment(Qt.AlignmentFlag.AlignCenter); item_type.setFont(font_bold)
-            if "截断" in type_text: item_type.setForeground(QBrush(QColor("purple")))
-            self.table.setItem(row_top, 1, item_type); self.table.setSpan(row_top, 1, 2, 1)
-            item_tree = QTableWidgetItem(f"🔴 识别: {match['full_path']}"); item_tree.setBackground(QColor("#FFF3E0")); item_tree.setFont(font_mono); item_tree.setToolTip(match['full_path']); self.table.setItem(row_top, 2, item_tree)
-            item_csv = QTableWidgetItem(f"🟢 标准: {match['csv_path']}"); item_csv.setBackground(QColor("#E8F5E9")); item_csv.setFont(font_mono); item_csv.setToolTip(match['csv_path']); self.table.setItem(row_bottom, 2, item_csv)
-            item_code = QTableWidgetItem(match['code']); item_code.setTextAlignment(Qt.AlignmentFlag.AlignCenter); item_code.setForeground(QBrush(QColor("blue"))); item_code.setFont(font_bold); self.table.setItem(row_top, 3, item_code); self.table.setSpan(row_top, 3, 2, 1)
+        # 筛选与批量操作
+        bar = QHBoxLayout(); self.cmb_type = QComboBox(); self.cmb_type.addItem("全部类型", None)
+        for t in sorted({m['match_type'] for m in fuzzy_matches}): self.cmb_type.addItem(t, t)
+        self.spin_score = QDoubleSpinBox(); self.spin_score.setRange(0, 100); self.spin_score.setDecimals(0); self.spin_score.setSuffix(" %"); self.spin_score.setPrefix("相似度 ≥ "); self.spin_score.setSingleStep(5)
+        btn_check = QPushButton("✔ 勾选筛选结果"); btn_uncheck = QPushButton("✖ 取消筛选结果"); self.lbl_count = QLabel()
+        bar.addWidget(self.cmb_type); bar.addWidget(self.spin_score); bar.addWidget(btn_check); bar.addWidget(btn_uncheck); bar.addStretch(); bar.addWidget(self.lbl_count)
+        layout.addLayout(bar)
+        self.model = MatchTableModel(fuzzy_matches, (font_mono, font_bold), self)
+        self.table = QTableView(); self.table.setModel(self.model); self.table.setItemDelegateForColumn(3, HtmlDelegate(self.table))
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows); self.table.setWordWrap(False)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Fixed); self.table.setColumnWidth(0, 60) 
+        header.setSectionResizeMode(1, QHeaderView.ResizeMode.Interactive); self.table.setColumnWidth(1, 120)
+        header.setSectionResizeMode(2, QHeaderView.ResizeMode.Fixed); self.table.setColumnWidth(2, 70)
+        header.setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch) 
+        header.setSectionResizeMode(4, QHeaderView.ResizeMode.Interactive); self.table.setColumnWidth(4, 120)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed); self.table.verticalHeader().setDefaultSectionSize(45)
+        self.table.setSortingEnabled(True); self.table.sortByColumn(2, Qt.SortOrder.DescendingOrder)
         layout.addWidget(self.table)
+        self.cmb_type.currentIndexChanged.connect(self.apply_filter); self.spin_score.valueChanged.connect(self.apply_filter)
+        btn_check.clicked.connect(lambda: self.model.set_checked_visible(True)); btn_uncheck.clicked.connect(lambda: self.model.set_checked_visible(False))
+        self.model.checkedChanged.connect(self.update_count); self.model.modelReset.connect(self.update_count); self.update_count()
         btn_box = QHBoxLayout()
         btn_ok = QPushButton("✅ 确认并修复"); btn_ok.setMinimumHeight(45); btn_ok.setFont(font_bold); btn_ok.clicked.connect(self.accept_selection)
         btn_cancel = QPushButton("全部放弃"); btn_cancel.setMinimumHeight(45); btn_cancel.clicked.connect(self.reject)
         btn_box.addStretch(); btn_box.addWidget(btn_cancel); btn_box.addWidget(btn_ok); layout.addLayout(btn_box)
+    def apply_filter(self): self.model.set_filter(self.cmb_type.currentData(), self.spin_score.value() / 100.0)
+    def update_count(self): self.lbl_count.setText(f"显示 {len(self.model.rows)} / 共 {len(self.fuzzy_matches)}，已勾选 {sum(self.model.checked)}")
     def accept_selection(self):
-        for i in range(0, self.table.rowCount(), 2):
-            if self.table.item(i, 0).checkState() == Qt.CheckState.Checked: self.result_list.append(self.fuzzy_matches[i // 2])
+        """采纳所有勾选的匹配 (含被筛选隐藏的)"""
+        self.result_list.extend(self.model.checked_matches())
         self.accept()
 
+class SearchWorker(QObject):
+    """后台搜索线程：只处理最新一次请求，过期的直接丢弃"""
+    results_ready = pyqtSignal(int, list)
+    def __init__(self, index):
+        super().__init__(); self.index = index; self.latest = 0
+    def run_query(self, seq, text):
+        if seq != self.latest: return
+        res = self.index.search(text, SEARCH_LIMIT)
+        if seq == self.latest: self.results_ready.emit(seq, res)
+
+class TaskWorker(QObject):
+    """在后台线程执行 fn(report, is_cancelled)；report(当前, 总量, 说明) 回报进度，取消时 fn 返回 None"""
+    progress = pyqtSignal(int, int, str)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    def __init__(self, fn):
+        super().__init__(); self.fn = fn; self.cancelled = False
+    def run(self):
+        try: result = self.fn(self.progress.emit, lambda: self.cancelled)
+        except Exception as e: self.failed.emit(str(e))
+        else: self.finished.emit(result)
+
+class HtmlDelegate(QStyledItemDelegate):
+    """按 HTML 绘制搜索结果，用于高亮命中片段"""
+    def paint(self, painter, option, index):
+        self.initStyleOption(option, index); doc = QTextDocument(); doc.setDefaultFont(option.font); doc.setHtml(option.text); option.text = ""
+        option.widget.style().drawControl(QStyle.ControlElement.CE_ItemViewItem, option, painter, option.widget)
+        painter.save(); painter.translate(option.rect.topLeft()); doc.drawContents(painter); painter.restore()
+
+class CategoryTreeModel(QAbstractItemModel):
+    """懒加载类目模型：数据在 CategoryStore 里，节点展开时才通过 fetchMore 生成行"""
+    HEADERS = ["类目结构", "编码 (Code)", "备注", "收藏"]
+    nodeEdited = pyqtSignal(int, int)  # (节点 id, 列) —— 用户在视图里改了名称/编码/备注
+
+    def __init__(self, store, icons, brush_for_code, parent=None):
+        super().__init__(parent)
+        self.store = store; self.icon_folder, self.icon_file = icons; self.brush_for_code = brush_for_code
+        self.fav_brushes = (QBrush(QColor("#BDBDBD")), QBrush(QColor("#FFD700")))
+        self.sort_column = 0; self.sort_order = Qt.SortOrder.AscendingOrder
+        self._rows = {}     # 已展开节点 -> 排好序的子节点 id 列表
+        self._row_of = {}   # 已生成行的节点 -> 在父节点中的行号
+
+    def node_of(self, index): return index.internalId() if index.isValid() else ROOT   # createIndex 传入的 int 即节点 id
+
+    def _sort_key(self):
+        s = self.store
+        return (s.name, s.code, s.remark, lambda n: s.fav[n])[self.sort_column]
+
+    def _sorted_children(self, node):
+        kids = self.store.child_list(node)
+        kids.sort(key=self._sort_key(), reverse=self.sort_order == Qt.SortOrder.DescendingOrder)
+        return kids
+
+    def _renumber(self, rows, start=0):
+        for i in range(start, len(rows)): self._row_of[rows[i]] = i
+
+    # ---------- QAbstractItemModel ----------
+    def index(self, row, column, parent=QModelIndex()):
+        rows = self._rows.get(self.node_of(parent))
+        if rows is None or not (0 <= row < len(rows)) or not (0 <= column < 4): return QModelIndex()
+        return self.createIndex(row, column, rows[row])
+
+    def parent(self, index=None):
+        if index is None: return super().parent()
+        if not index.isValid(): return QModelIndex()
+        p = self.store.parent[index.internalId()]
+        if p == ROOT or p not in self._row_of: return QModelIndex()
+        return self.createIndex(self._row_of[p], 0, p)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0: return 0
+        return len(self._rows.get(self.node_of(parent), ()))
+
+    def columnCount(self, parent=QModelIndex()): return 4
+
+    def hasChildren(self, parent=QModelIndex()):
+        if parent.column() > 0: return False
+        return self.store.child_count[self.node_of(parent)] > 0
+
+    def canFetchMore(self, parent):
+        node = self.node_of(parent)
+        return node not in self._rows and self.store.child_count[node] > 0
+
+    def fetchMore(self, parent):
+        node = self.node_of(parent)
+        if node in self._rows: return
+        kids = self._sorted_children(node)
+        if not kids: self._rows[node] = kids; return
+        self.beginInsertRows(parent, 0, len(kids) - 1)
+        self._rows[node] = kids; self._renumber(kids)
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        n = index.internalId(); col = index.column(); s = self.store
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            if col == 0: return s.name(n)
+            if col == 1: return s.code(n)
+            if col == 2: return s.remark(n)
+            return "★" if s.fav[n] else "☆"
+        if role == Qt.ItemDataRole.DecorationRole and col == 0: return self.icon_folder if s.is_folder[n] else self.icon_file
+        if role == Qt.ItemDataRole.BackgroundRole: return self.brush_for_code(s.code(n))
+        if role == Qt.ItemDataRole.ForegroundRole and col == 3: return self.fav_brushes[s.fav[n]]
+        if role == Qt.ItemDataRole.UserRole: return s.name(n) if col == 0 else bool(s.fav[n])
+        if role == ROLE_IS_FOLDER: return bool(s.is_folder[n])
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or role != Qt.ItemDataRole.EditRole or index.column() > 2: return False
+        n = index.internalId(); col = index.column(); value = str(value)
+        if value == self.data(index, role): return False
+        (self.store.set_name, self.store.set_code, self.store.set_remark)[col](n, value)
+        self.refresh_node(n); self.nodeEdited.emit(n, col)
+        return True
+
+    def flags(self, index):
+        if not index.isValid(): return Qt.ItemFlag.NoItemFlags
+        f = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        return f | Qt.ItemFlag.ItemIsEditable if index.column() < 3 else f
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole: return self.HEADERS[section]
+        return None
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        self.sort_column = column; self.sort_order = order
+        old = self.persistentIndexList(); keep = [(i.internalId(), i.column()) for i in old]
+        for node in self._rows: self._rows[node] = rows = self._sorted_children(node); self._renumber(rows)
+        self.changePersistentIndexList(old, [self.createIndex(self._row_of[n], c, n) for n, c in keep])
+        self.layoutChanged.emit()
+
+    # ---------- 供界面调用的节点操作 ----------
+    def set_store(self, store):
+        self.beginResetModel()
+        self.store = store; self._rows = {}; self._row_of = {}
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def is_loaded(self, node): return node == ROOT or self.store.parent[node] in self._rows
+    def loaded_children(self, node): return self._rows.get(node, ())
+
+    def node_index(self, node, column=0):
+        """返回节点的索引，必要时逐级 fetchMore 其祖先"""
+        if node == ROOT or not self.store.alive[node]: return QModelIndex()
+        chain = []; p = node
+        while p != ROOT: chain.append(p); p = self.store.parent[p]
+        idx = QModelIndex()
+        for a in reversed(chain):
+            if self.store.parent[a] not in self._rows: self.fetchMore(idx)
+            idx = self.createIndex(self._row_of[a], 0, a)
+        return idx.siblingAtColumn(column) if column else idx
+
+    def refresh_node(self, node):
+        if node != ROOT and self.is_loaded(node):
+            row = self._row_of[node]
+            self.dataChanged.emit(self.createIndex(row, 0, node), self.createIndex(row, 3, node))
+
+    def insert_node(self, parent_node, name, is_folder, code="", remark="", fav=False):
+        n = self.store.add_node(parent_node, name, code, remark, fav, is_folder)
+        rows = self._rows.get(parent_node)
+        if rows is None: self.refresh_node(parent_node); return n
+        key = self._sort_key(); k = key(n); desc = self.sort_order == Qt.SortOrder.DescendingOrder
+        pos = next((i for i, c in enumerate(rows) if (key(c) < k if desc else key(c) > k)), len(rows))
+        self.beginInsertRows(self.node_index(parent_node), pos, pos)
+        rows.insert(pos, n); self._renumber(rows, pos)
+        self.endInsertRows()
+        return n
+
+    def remove_node(self, node):
+        if node == ROOT or not self.store.alive[node]: return []
+        p = self.store.parent[node]; rows = self._rows.get(p)
+        if rows is not None:
+            row = self._row_of[node]
+            self.beginRemoveRows(self.node_index(p), row, row)
+            del rows[row]; self._renumber(rows, row)
+            self.endRemoveRows()
+        removed = self.store.remove(node)
+        for r in removed: self._rows.pop(r, None); self._row_of.pop(r, None)
+        return removed
+
+class TreeApplier(StoreApplier):
+    """合并远端修改时经由模型增删行、刷新单元格，视图的展开/选中状态保持不动"""
+    def __init__(self, app): super().__init__(app.store); self.app = app
+
+    def set(self, n, f, v):
+        super().set(n, f, v)
+        if f == "code": self.app.brush_for_code(v)
+        self.app.model.refresh_node(n)
+
+    def add(self, parent, src, m):
+        return self.app.model.insert_node(parent, src.name(m), src.is_folder[m], src.code(m), src.remark(m), src.fav[m])
+
+    def remove(self, n): self.app.model.remove_node(n)
+
+def holding_sync(fn):
+    """界面操作期间 (含其中弹出的模态对话框，它们会跑嵌套事件循环) 推迟合并远端修改，
+    免得合并删掉操作手里还拿着的节点；结束后补做一次。
+    包装后的 *args 会让 PyQt 把信号的全部参数 (如 clicked 的 checked) 都传进来，这里按原函数的位置参数个数截掉多余的"""
+    nargs = inspect.unwrap(fn).__code__.co_argcount - 1   # 不含 self
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kw):
+        self._sync_hold += 1
+        try: return fn(self, *args[:nargs], **kw)
+        finally:
+            self._sync_hold -= 1
+            if not self._sync_hold and self._sync_pending: self._sync_pending = False; self.sync_timer.start()
+    return wrapper
+
 class CategoryApp(QMainWindow):
+    search_requested = pyqtSignal(int, str)
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Homedepot 智能工作台 (Fix v2)")
@@ -84,296 +405,464 @@ class CategoryApp(QMainWindow):
         self.is_dirty = False
         self.prefix_color_map = {} 
         self.next_color_index = 0
-        self.load_counter = 0 
+        self.store = CategoryStore()
+        self.search_index = SearchIndex(self.store); self.path_index = PathIndex(self.store)
+        self.journal = None   # 当前项目的追加式修改日志 (新建未保存的项目没有)
+        self._bulk_expanding = False
+        self.base_store = None; self.base_hashes = None; self.base_fp = None   # 上次加载/保存时的快照及其子树哈希，合并远端修改用
+        self._sync_hold = 0; self._sync_pending = False   # 见 holding_sync
         
-        # 修复 3: 图标缓存
+        # 修复 3: 图标 / 底色画刷缓存，所有行共用
         self.icon_folder = self.style().standardIcon(QStyle.StandardPixmap.SP_DirIcon)
         self.icon_file = self.style().standardIcon(QStyle.StandardPixmap.SP_FileIcon)
+        self.palette_brushes = [QBrush(QColor(c)) for c in COLOR_PALETTE]
 
         if platform.system() == "Windows": self.setFont(QFont("Microsoft YaHei UI", 10))
         else: self.setFont(QFont(".AppleSystemUIFont", 12)) 
             
         self.init_ui()
-        self.tree_widget.itemCollapsed.connect(self.on_item_collapsed_recursive)
-        self.tree_widget.itemClicked.connect(self.on_item_clicked)
-        self.tree_widget.itemChanged.connect(self.on_item_changed)
+        self.tree_view.collapsed.connect(self.on_item_collapsed_recursive)
+        self.tree_view.expanded.connect(self.on_item_expanded)
+        self.tree_view.clicked.connect(self.on_item_clicked)
+        self.model.nodeEdited.connect(self.on_item_changed)
+        self.init_search_worker()
+        self.autosave_timer = QTimer(self); self.autosave_timer.timeout.connect(self.autosave); self.autosave_timer.start(AUTOSAVE_MS)
+        self.file_watcher = QFileSystemWatcher(self); self.sync_timer = QTimer(self); self.sync_timer.setSingleShot(True); self.sync_timer.setInterval(SYNC_DELAY_MS)
+        self.file_watcher.fileChanged.connect(lambda _: self.sync_timer.start()); self.sync_timer.timeout.connect(self.sync_from_disk)
+        self.profile_timer = QTimer(self); self.profile_timer.timeout.connect(self.refresh_profile_label); self._profile_shown = None
+        self.chk_profile.setChecked(PROFILER.enabled); self.set_profiling(PROFILER.enabled); self.chk_profile.toggled.connect(self.set_profiling)
         self.load_last_session()
 
+    def init_search_worker(self):
+        self.search_seq = 0
+        self.search_timer = QTimer(self); self.search_timer.setSingleShot(True); self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.request_search); self.search_input.textChanged.connect(lambda _: self.search_timer.start())
+        self.search_thread = QThread(self); self.search_worker = SearchWorker(self.search_index); self.search_worker.moveToThread(self.search_thread)
+        self.search_requested.connect(self.search_worker.run_query); self.search_worker.results_ready.connect(self.show_search_results)
+        self.search_thread.start()
+
+    def closeEvent(self, event):
+        if self.journal: self.journal.flush()
+        self.search_thread.quit(); self.search_thread.wait(); super().closeEvent(event)
+
+    def autosave(self):
+        """定时把修改日志的增量落盘。不替用户全量保存：项目文件是共享的，写进去就等于把修改发布给了同事；
+        日志过长时只提醒，由用户保存时并回快照"""
+        if not self.journal: return
+        try:
+            written = self.journal.flush(); c = self.journal.count
+            if c // JOURNAL_HINT_OPS > (c - written) // JOURNAL_HINT_OPS:   # 每攒够一批提醒一次
+                self.statusBar().showMessage(f"已有 {c} 条修改只记在修改日志里，保存项目后才会并入项目文件", 5000)
+        except OSError as e: self.statusBar().showMessage(f"自动保存失败: {e}")
+
+    def start_journal(self, path, base):
+        self.journal = ChangeJournal(journal_path(path), base); self.journal.attach(self.store)
+
+    @PROFILER.profiled("snapshot")
+    def set_snapshot(self, path, base, fp):
+        """记下磁盘快照 (独立于正在编辑的树的副本) 及其指纹并计算子树哈希，开始监视项目文件"""
+        if base is None: self.base_store = self.base_hashes = self.base_fp = None
+        else: self.base_store = base; self.base_hashes = compute_hashes(base); self.base_fp = fp
+        if self.file_watcher.files(): self.file_watcher.removePaths(self.file_watcher.files())
+        if path: self.file_watcher.addPath(path)
+
     def init_ui(self):
         central_widget = QWidget(); self.setCentralWidget(central_widget); main_layout = QVBoxLayout(central_widget)
         project_group = QGroupBox("📁 项目协同"); project_layout = QHBoxLayout(); self.lbl_status = QLabel("状态: 等待加载")
         btn_new = QPushButton("📄 新建"); btn_new.clicked.connect(self.new_project_from_opml)
         btn_open = QPushButton("📂 打开"); btn_open.clicked.connect(self.open_project_manual)
         btn_save = QPushButton("💾 保存"); btn_save.clicked.connect(self.save_project)
+        btn_save_as = QPushButton("📑 另存为"); btn_save_as.setToolTip("可选二进制项目或 JSON 格式"); btn_save_as.clicked.connect(self.save_project_as)
         btn_reload = QPushButton("🔄 刷新"); btn_reload.clicked.connect(self.reload_project)
+        self.chk_profile = QCheckBox("⏱ 性能分析"); self.chk_profile.setToolTip("记录各操作分阶段耗时与计数器，状态栏显示最近一次")
+        btn_profile = QPushButton("导出分析"); btn_profile.setToolTip("导出 Chrome trace JSON (chrome://tracing 或 Perfetto 打开)"); btn_profile.clicked.connect(self.export_profile)
         project_layout.addWidget(self.lbl_status); project_layout.addStretch()
-        project_layout.addWidget(btn_new); project_layout.addWidget(btn_open); project_layout.addWidget(btn_save); project_layout.addWidget(btn_reload)
+        project_layout.addWidget(btn_new); project_layout.addWidget(btn_open); project_layout.addWidget(btn_save); project_layout.addWidget(btn_save_as); project_layout.addWidget(btn_reload)
+        project_layout.addWidget(self.chk_profile); project_layout.addWidget(btn_profile)
+        self.lbl_profile = QLabel(); self.statusBar().addPermanentWidget(self.lbl_profile)
         project_group.setLayout(project_layout); main_layout.addWidget(project_group)
-        op_layout = QHBoxLayout(); self.search_input = QLineEdit(); self.search_input.setPlaceholderText("🔍 搜索...")
+        op_layout = QHBoxLayout(); self.search_input = QLineEdit(); self.search_input.setPlaceholderText("🔍 搜索... (#编码 按编码查找)")
         self.search_input.returnPressed.connect(self.perform_fuzzy_search)
         self.btn_csv = QPushButton("导入CSV更新"); self.btn_csv.clicked.connect(self.load_csv_and_update)
         self.spin_start = QSpinBox(); self.spin_start.setRange(1, 999999); self.spin_start.setValue(2); self.spin_start.setPrefix("Start: "); self.spin_end = QSpinBox(); self.spin_end.setRange(1, 999999); self.spin_end.setValue(1000); self.spin_end.setPrefix("End: ")
-        self.btn_export = QPushButton("导出MD"); self.btn_export.clicked.connect(self.export_markdown)
-        op_layout.addWidget(self.search_input); op_layout.addWidget(self.btn_csv); op_layout.addWidget(self.spin_start); op_layout.addWidget(self.spin_end); op_layout.addWidget(self.btn_export)
+        self.chk_parallel = QCheckBox("多核匹配"); self.chk_parallel.setToolTip("OCR 模糊匹配分发到多个进程 (叶子较多时生效)")
+        self.btn_export = QToolButton(); self.btn_export.setText("导出"); self.btn_export.setToolTip("按扩展名导出缩进文本 / CSV / XLSX / OPML；右侧箭头选过滤条件")
+        self.btn_export.setPopupMode(QToolButton.ToolButtonPopupMode.MenuButtonPopup); self.btn_export.clicked.connect(self.export_catalog)
+        export_menu = QMenu(self.btn_export)
+        self.act_export_coded = export_menu.addAction("只导出有编码的叶子"); self.act_export_fav = export_menu.addAction("只导出收藏")
+        self.act_export_subtree = export_menu.addAction("只导出选中节点的子树")
+        for a in (self.act_export_coded, self.act_export_fav, self.act_export_subtree): a.setCheckable(True)
+        self.btn_export.setMenu(export_menu)
+        btn_dups = QPushButton("查重"); btn_dups.setToolTip("列出重复的编码和重复的路径"); btn_dups.clicked.connect(self.show_duplicates)
+        op_layout.addWidget(self.search_input); op_layout.addWidget(btn_dups); op_layout.addWidget(self.btn_csv); op_layout.addWidget(self.spin_start); op_layout.addWidget(self.spin_end); op_layout.addWidget(self.chk_parallel); op_layout.addWidget(self.btn_export)
         main_layout.addLayout(op_layout)
-        self.tree_widget = QTreeWidget(); self.tree_widget.setHeaderLabels(["类目结构", "编码 (Code)", "备注", "收藏"])
-        self.tree_widget.setColumnWidth(0, 500); self.tree_widget.setColumnWidth(1, 150); self.tree_widget.setColumnWidth(2, 200); self.tree_widget.setColumnWidth(3, 50)
-        self.tree_widget.setStyleSheet("QTreeWidget::item:selected { background-color: black; color: white; }")
-        self.tree_widget.setAlternatingRowColors(False); self.tree_widget.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
-        self.tree_widget.customContextMenuRequested.connect(self.open_context_menu); main_layout.addWidget(self.tree_widget)
+        self.search_results = QListWidget(); self.search_results.setItemDelegate(HtmlDelegate(self.search_results)); self.search_results.setMaximumHeight(220); self.search_results.hide()
+        self.search_results.itemActivated.connect(self.on_search_result_chosen); self.search_results.itemClicked.connect(self.on_search_result_chosen)
+        main_layout.addWidget(self.search_results)
+        # 树数据放在 CategoryStore，视图通过懒加载模型按需取行
+        self.model = CategoryTreeModel(self.store, (self.icon_folder, self.icon_file), self.brush_for_code, self)
+        self.tree_view = QTreeView(); self.tree_view.setModel(self.model); self.tree_view.setUniformRowHeights(True)
+        self.tree_view.setColumnWidth(0, 500); self.tree_view.setColumnWidth(1, 150); self.tree_view.setColumnWidth(2, 200); self.tree_view.setColumnWidth(3, 50)
+        self.tree_view.setStyleSheet("QTreeView::item:selected { background-color: black; color: white; }")
+        self.tree_view.setAlternatingRowColors(False); self.tree_view.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.tree_view.customContextMenuRequested.connect(self.open_context_menu); main_layout.addWidget(self.tree_view)
         
         # 修复 4: 开启默认排序
-        self.tree_widget.setSortingEnabled(True)
-        self.tree_widget.sortByColumn(0, Qt.SortOrder.AscendingOrder)
+        self.tree_view.setSortingEnabled(True)
+        self.tree_view.sortByColumn(0, Qt.SortOrder.AscendingOrder)
+
+    @PROFILER.profiled("set_store")
+    def set_store(self, store):
+        """换上新的树数据：登记编码配色，重置模型并恢复保存时的展开状态"""
+        if self.journal: self.journal.flush(); self.journal.detach(); self.journal = None
+        self.store = store; self.prefix_color_map = {}; self.next_color_index = 0
+        self.path_index.close(); self.path_index = PathIndex(store)
+        for p in self.path_index.prefixes(): self.brush_for_code(p)
+        self.model.set_store(store)
+        self.search_index.close(); self.search_index = SearchIndex(store)
+        if hasattr(self, 'search_worker'): self.search_worker.index = self.search_index
+        self.restore_expanded(ROOT)
+
+    def expand_to_node(self, node): self.expand_to_nodes((node,))
+
+    def expand_to_nodes(self, nodes):
+        """展开一批节点的全部祖先：每个祖先只走一次 (遇到已处理的就停)，父节点先展开"""
+        s = self.store; seen = set(); order = []
+        for n in nodes:
+            chain = []
+            for p in s.ancestors(n):
+                if p in seen: break
+                seen.add(p); chain.append(p)
+            order.extend(reversed(chain))
+        self.expand_nodes(order)
 
-    def set_item_type(self, item, is_folder):
-        item.setData(0, ROLE_IS_FOLDER, is_folder)
-        if is_folder: item.setIcon(0, self.icon_folder)
-        else: item.setIcon(0, self.icon_file)
+    def expand_nodes(self, nodes):
+        """依次展开 (父节点须在前)；期间不触发逐个恢复子级展开状态"""
+        self._bulk_expanding = True
+        try:
+            for n in nodes:
+                if not (self.store.expanded[n] and self.tree_view.isExpanded(self.model.node_index(n))): self.tree_view.expand(self.model.node_index(n))
+        finally: self._bulk_expanding = False
+
+    def request_search(self):
+        """防抖结束：把查询投递给后台线程 (少于 2 个字符不查)"""
+        t = self.search_input.text().strip(); self.search_seq += 1; self.search_worker.latest = self.search_seq
+        if t.startswith("#"): self.show_node_list(self.find_by_code(t[1:])); return
+        if len(t) < 2: self.search_results.clear(); self.search_results.hide(); return
+        self.search_requested.emit(self.search_seq, t)
+
+    def find_by_code(self, code):
+        """“#编码” 查编码完全一致的节点；没有且不含 “/” 时按编码前缀查"""
+        code = code.strip()
+        if not code: return []
+        nodes = self.path_index.find_code(code)
+        if not nodes and "/" not in code: nodes = sorted(self.path_index.find_prefix(code))
+        return [(n, "") for n in nodes]
+
+    def show_node_list(self, items):
+        """结果列表直接列出节点 (编码 + 路径)，items 为 [(节点, 前缀说明)]"""
+        self.search_results.clear(); s = self.store
+        for n, tag in items[:SEARCH_LIMIT * 10]:
+            path = s.full_path(n)
+            it = QListWidgetItem(f"{tag}<b style='color:#1565C0'>{html.escape(s.code(n))}</b> {html.escape(path)}")
+            it.setData(Qt.ItemDataRole.UserRole, n); it.setToolTip(path); self.search_results.addItem(it)
+        self.search_results.setVisible(bool(items))
+
+    def show_duplicates(self):
+        """列出被多个节点共用的编码、以及规范化后路径相同的节点"""
+        codes, paths = self.path_index.duplicate_codes(), self.path_index.duplicate_paths(); items = []
+        for nodes in codes.values(): items.extend((n, "⚠ 编码重复 ") for n in nodes)
+        for nodes in paths.values(): items.extend((n, "⚠ 路径重复 ") for n in nodes)
+        self.search_input.blockSignals(True); self.search_input.clear(); self.search_input.blockSignals(False)
+        self.show_node_list(items)
+        self.statusBar().showMessage(f"重复编码 {len(codes)} 组，重复路径 {len(paths)} 组" if items else "没有重复的编码或路径")
+
+    def show_search_results(self, seq, results):
+        if seq != self.search_seq: return
+        self.search_results.clear()
+        for r in results:
+            name = r['name']; parts = []; last = 0
+            for a, b in r['spans']: parts.append(html.escape(name[last:a])); parts.append(f"<b style='color:#E65100'>{html.escape(name[a:b])}</b>"); last = b
+            parts.append(html.escape(name[last:])); parent_path = r['path'][:-len(name)].rstrip("/")
+            it = QListWidgetItem(f"{''.join(parts)} <span style='color:#9E9E9E'>{html.escape(parent_path)}</span>")
+            it.setData(Qt.ItemDataRole.UserRole, r['node']); it.setToolTip(r['path']); self.search_results.addItem(it)
+        self.search_results.setVisible(bool(results))
 
+    def on_search_result_chosen(self, it):
+        node = it.data(Qt.ItemDataRole.UserRole)
+        if self.store.alive[node]: self.locate_node(node)
+
+    def locate_node(self, node):
+        self.tree_view.clearSelection(); self.expand_to_node(node); idx = self.model.node_index(node)
+        self.tree_view.setCurrentIndex(idx); self.tree_view.scrollTo(idx)
+        self.statusBar().showMessage(f"已定位: {self.store.name(node)}")
+
+    @PROFILER.profiled("search.locate")
     def perform_fuzzy_search(self):
+        """回车：直接定位排名第一的结果"""
         t = self.search_input.text().strip()
         if not t: return
-        self.tree_widget.clearSelection(); self.tree_widget.collapseAll()
-        from PyQt6.QtWidgets import QTreeWidgetItemIterator
-        it = QTreeWidgetItemIterator(self.tree_widget); best, b_score = None, 0.0
-        while it.value():
-            item = it.value(); raw = item.data(0, Qt.ItemDataRole.UserRole)
-            if raw is None: raw = "" 
-            path = self.get_full_path(item)
-            s = max(difflib.SequenceMatcher(None, t.lower(), path.lower()).ratio(), difflib.SequenceMatcher(None, t.lower(), raw.lower()).ratio())
-            if s > b_score: b_score = s; best = item
-            it += 1
-        if best and b_score > 0.6:
-            self.tree_widget.setCurrentItem(best); self.tree_widget.scrollToItem(best); best.setSelected(True)
-            p = best.parent()
-            while p: p.setExpanded(True); p = p.parent()
-            self.statusBar().showMessage(f"已定位: {best.text(0)}")
+        if t.startswith("#"): res = [{"node": n} for n, _ in self.find_by_code(t[1:])]
+        else: res = self.search_index.search(t, 1)
+        if res: self.locate_node(res[0]['node'])
         else: QMessageBox.warning(self, "提示", "未找到匹配项")
 
     def new_project_from_opml(self):
         path, _ = QFileDialog.getOpenFileName(self, "选择 OPML", "", "OPML (*.opml)")
-        if path:
-            try: 
-                self.progress = QProgressDialog("正在解析庞大的目录树，请稍候...", "取消", 0, 0, self)
-                self.progress.setWindowModality(Qt.WindowModality.WindowModal)
-                self.progress.show()
-                self.tree_widget.setUpdatesEnabled(False); self.tree_widget.blockSignals(True); self.tree_widget.setSortingEnabled(False)
-                
-                tree = ET.parse(path); root = tree.getroot().find('body')
-                self.tree_widget.clear()
-                self.load_counter = 0 
-                self.populate_tree_from_xml(root, self.tree_widget)
-                self.current_project_path = None
-                self.update_status("新项目")
-                self.progress.close()
-            except Exception as e: QMessageBox.critical(self, "Error", str(e))
-            finally:
-                self.tree_widget.setUpdatesEnabled(True); self.tree_widget.blockSignals(False); self.tree_widget.setSortingEnabled(True)
-
-    def populate_tree_from_xml(self, xml_node, parent):
-        self.load_counter += 1
-        if self.load_counter % 50 == 0:
-            QApplication.processEvents()
-            if hasattr(self, 'progress') and self.progress.wasCanceled(): return
-        for child in xml_node:
-            t = child.get('text') or child.get('title')
-            if t:
-                item = QTreeWidgetItem(parent)
-                item.setText(0, t); item.setData(0, Qt.ItemDataRole.UserRole, t); item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable); self.set_favorite_state(item, False)
-                self.populate_tree_from_xml(child, item)
-                self.set_item_type(item, item.childCount() > 0)
-                item.setExpanded(False)
+        if not path: return
+        def job(report, is_cancelled):
+            def on_progress(done, total, built): report(int(done * 1000 / max(total, 1)), 1000, f"已读 {done >> 10} / {total >> 10} KB，已建 {built} 个节点")
+            try: return load_opml(path, progress=on_progress, is_cancelled=is_cancelled)
+            except OpmlCancelled: return None
+        def done(store):
+            if store is None: self.statusBar().showMessage("已取消导入 OPML"); return
+            self.set_store(store); self.current_project_path = None; self.set_snapshot(None, None, None); self.update_status("新项目")
+        self.run_task(job, "正在解析庞大的目录树，请稍候...", done)
+
+    def run_task(self, fn, label, on_done):
+        """后台线程跑 fn，期间显示可取消的进度框；完成后在界面线程调用 on_done(结果)"""
+        self.progress = QProgressDialog(label, "取消", 0, 1000, self); self.progress.setWindowModality(Qt.WindowModality.WindowModal)
+        self.progress.setAutoClose(False); self.progress.setAutoReset(False); self.progress.setMinimumDuration(0)
+        thread = QThread(self); worker = TaskWorker(fn); worker.moveToThread(thread)
+        self._task = (thread, worker)
+        def update(cur, total, text): self.progress.setMaximum(total); self.progress.setValue(cur); self.progress.setLabelText(f"{label}\n{text}")
+        def finish(result=None, error=None):
+            thread.quit(); thread.wait(); self.progress.close(); self._task = None
+            if error is not None: QMessageBox.critical(self, "Error", error)
+            else: on_done(result)
+        def cancel(): worker.cancelled = True; self.progress.setLabelText("正在取消...")
+        worker.progress.connect(update); worker.finished.connect(lambda r: finish(r)); worker.failed.connect(lambda e: finish(error=e))
+        self.progress.canceled.connect(cancel); thread.started.connect(worker.run)
+        self.progress.show(); thread.start()
 
+    @holding_sync
+    @PROFILER.profiled("project.load")
     def load_project_from_path(self, path):
         try:
             self.progress = QProgressDialog("正在加载项目...", "取消", 0, 0, self)
             self.progress.show()
             QApplication.processEvents()
-            with open(path, 'r', encoding='utf-8') as f: data = json.load(f)
-            
-            self.tree_widget.setUpdatesEnabled(False); self.tree_widget.blockSignals(True); self.tree_widget.setSortingEnabled(False)
-            self.tree_widget.clear(); self.prefix_color_map = {}; self.next_color_index = 0; self.load_counter = 0
-            
-            # ================= 关键修复: 兼容 List 和 Dict 两种数据结构 =================
-            if isinstance(data, list):
-                # 如果是列表，直接加载（老版本数据）
-                self.deserialize_tree(data, self.tree_widget)
-            elif isinstance(data, dict):
-                # 如果是字典，说明是新版本保存的根节点，提取 children
-                children = data.get("children", [])
-                self.deserialize_tree(children, self.tree_widget)
-            # =======================================================================
-            
-            self.current_project_path = path; self.is_dirty = False; self.update_status(f"协同: {os.path.basename(path)}")
+            # 二进制项目直接按列建树；JSON 兼容 List (老版本) 和 Dict (新版本根节点) 两种数据结构
+            with open(path, 'rb') as f: data = f.read()
+            store = parse_project(data); base = data_fingerprint(data); jp = journal_path(path); replayed = 0
+            snap = store.snapshot()   # 回放日志之前的磁盘状态，合并远端修改时作三方基准
+            # 回放上次未并入快照的修改日志 (异常退出也不丢)；快照已被别人改过则把日志改名留档
+            try: replayed = replay_journal(store, jp, base)
+            except JournalMismatch as e:
+                stale = f"{jp}.stale-{int(time.time())}"; os.replace(jp, stale); store = snap.snapshot()
+                QMessageBox.warning(self, "修改日志未恢复", f"{e}\n旧日志已另存为: {os.path.basename(stale)}")
+            if self.journal: self.journal.flush()
+            self.set_store(store); self.start_journal(path, base); self.set_snapshot(path, snap, base)
+            self.current_project_path = path; self.is_dirty = replayed > 0
+            self.update_status(f"协同: {os.path.basename(path)}" + (f" (已恢复 {replayed} 条未保存修改)" if replayed else ""))
             self.settings.setValue("last_project_path", path); self.progress.close()
         except Exception as e: QMessageBox.warning(self, "Error", str(e))
-        finally: 
-            self.tree_widget.setUpdatesEnabled(True); self.tree_widget.blockSignals(False); self.tree_widget.setSortingEnabled(True)
-
-    def deserialize_tree(self, data_list, parent):
-        self.load_counter += 1
-        if self.load_counter % 50 == 0: QApplication.processEvents()
-        
-        # 确保 data_list 是列表，防止意外 crash
-        if not isinstance(data_list, list): return
-
-        for node in data_list:
-            item = QTreeWidgetItem(parent)
-            name = node.get("name", ""); code = node.get("code", ""); remark = node.get("remark", ""); fav = node.get("fav", False)
-            is_folder = node.get("is_folder", len(node.get("children", [])) > 0)
-            item.setText(0, name); item.setData(0, Qt.ItemDataRole.UserRole, name)
-            item.setText(1, code); self.apply_color_by_code(item, code)
-            item.setText(2, remark); self.set_favorite_state(item, fav)
-            self.set_item_type(item, is_folder); item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
-            self.deserialize_tree(node.get("children", []), item)
-            item.setExpanded(node.get("expanded", False))
 
+    @holding_sync
     def load_csv_and_update(self):
-        csv_path, _ = QFileDialog.getOpenFileName(self, "选择 CSV", "", "CSV Files (*.csv)")
-        if not csv_path: return
-        self.tree_widget.blockSignals(True); self.tree_widget.setUpdatesEnabled(False); self.tree_widget.setSortingEnabled(False) 
+        csv_paths, _ = QFileDialog.getOpenFileNames(self, "选择 CSV / XLSX (可多选合并)", "", "表格 (*.csv *.xlsx);;CSV Files (*.csv);;Excel (*.xlsx)")
+        if not csv_paths: return
         try:
-            start_idx = max(0, self.spin_start.value() - 2); end_idx = self.spin_end.value() - 2
-            df = pd.read_csv(csv_path); df.columns = [c.strip() for c in df.columns]
-            subset = df.loc[start_idx:end_idx]
-            csv_rules = {}
-            for _, row in subset.iterrows():
-                p = str(row.get('类目途径', '')).strip(); c = str(row.get('分类', '')).strip()
-                if p and c and c != 'nan':
-                    norm = self.normalize(p); csv_rules[norm] = {"code": c, "leaf": p.replace("\\", "/").split("/")[-1], "raw_path": p}
-            self.pending_exact = []; self.pending_fuzzy = [] 
-            self.scan_matches(self.tree_widget.invisibleRootItem(), [], csv_rules)
-            final = self.pending_exact 
-            if self.pending_fuzzy:
-                self.tree_widget.blockSignals(False)
-                dialog = MatchReviewDialog(self.pending_fuzzy, self)
-                if dialog.exec(): final.extend(dialog.result_list)
-                else: QMessageBox.information(self, "提示", "已取消模糊匹配")
-                self.tree_widget.blockSignals(True)
-            cnt = 0
-            for act in final:
-                item, code = act['item'], act['code']
-                if item.text(1) != code:
-                    item.setText(1, code); self.apply_color_by_code(item, code)
-                    p = item.parent()
-                    while p: p.setExpanded(True); p = p.parent()
-                    cnt += 1
+            with PROFILER.span("csv"):
+                # 只读 类目途径/分类 两列，按 Start/End 行窗口分块流式读取，多个文件合并成一份规则
+                start_idx = max(0, self.spin_start.value() - 2); end_idx = self.spin_end.value() - 2
+                csv_rules = read_rules(csv_paths, start_idx, end_idx)
+                self.pending_exact = []; self.pending_fuzzy = [] 
+                self.scan_matches(ROOT, csv_rules)
+                final = self.pending_exact; st = self.ocr_engine.stats
+                self.statusBar().showMessage(f"精确 {len(self.pending_exact)} / 模糊 {len(self.pending_fuzzy)}，OCR 候选剪枝 {st['pruned']}，打分 {st['scored']}")
+                if self.pending_fuzzy:
+                    with PROFILER.span("review.build"): dialog = MatchReviewDialog(self.pending_fuzzy, self)
+                    with PROFILER.span("review.wait"): ok = dialog.exec()   # 含人工确认的时间
+                    if ok: final.extend(dialog.result_list)
+                    else: QMessageBox.information(self, "提示", "已取消模糊匹配")
+                self.tree_view.setUpdatesEnabled(False)
+                changed = []; cnt = apply_codes(self.store, final, lambda node, code: (self.apply_color_by_code(node, code), changed.append(node)))
+                with PROFILER.span("expand"): self.expand_to_nodes(changed)
+                PROFILER.count("items_recolored", cnt)
             self.is_dirty = True; QMessageBox.information(self, "完成", f"更新: {cnt}")
         except Exception as e: QMessageBox.critical(self, "错误", str(e)); import traceback; traceback.print_exc()
-        finally: 
-            self.tree_widget.setUpdatesEnabled(True); self.tree_widget.blockSignals(False); self.tree_widget.setSortingEnabled(True)
-
-    def scan_matches(self, item, stack, csv_rules):
-        raw = item.data(0, Qt.ItemDataRole.UserRole); ns = stack + [raw] if raw else []
-        if item.childCount() > 0:
-            for i in range(item.childCount()): self.scan_matches(item.child(i), ns, csv_rules)
-        is_folder = item.data(0, ROLE_IS_FOLDER)
-        if is_folder: return 
-        if raw:
-            norm = self.normalize("/".join(ns))
-            if norm in csv_rules: self.pending_exact.append({"item": item, "code": csv_rules[norm]['code'], "tree_name": raw, "type": "exact"})
-            else: self.check_ocr(item, raw, norm, csv_rules)
-
-    def check_ocr(self, item, raw, norm, rules):
-        keys = list(rules.keys()); m = difflib.get_close_matches(norm, keys, n=1, cutoff=0.75)
-        if m:
-            cand = rules[m[0]]; t_leaf, c_leaf = raw, cand['leaf']
-            if len(t_leaf) > len(c_leaf) + 2: return
-            if c_leaf.lower().startswith(t_leaf.lower()): self.add_fz(item, cand, raw, "⚠️ 尾部截断", cand['raw_path'])
-            elif difflib.SequenceMatcher(None, t_leaf.lower(), c_leaf[:len(t_leaf)].lower()).ratio() > 0.75: self.add_fz(item, cand, raw, "🔡 OCR 错字", cand['raw_path'])
-
-    def add_fz(self, item, dat, t_name, typ, c_path):
-        self.pending_fuzzy.append({"item": item, "code": dat['code'], "tree_name": t_name, "full_path": self.get_full_path(item), "csv_path": c_path, "match_type": typ})
-
-    def on_item_collapsed_recursive(self, item):
-        self.tree_widget.itemCollapsed.disconnect(self.on_item_collapsed_recursive); self.recursive_collapse(item); self.tree_widget.itemCollapsed.connect(self.on_item_collapsed_recursive)
-    def recursive_collapse(self, item):
-        for i in range(item.childCount()): child = item.child(i); child.setExpanded(False); self.recursive_collapse(child)
+        finally: self.tree_view.setUpdatesEnabled(True)
+
+    def scan_matches(self, top, csv_rules):
+        """叶子先查精确路径，剩下的整批交给 OCR 匹配引擎 (可多进程)"""
+        from category_match import default_processes
+        processes = default_processes() if self.chk_parallel.isChecked() else 1
+        exact, fuzzy, self.ocr_engine = scan_matches(self.store, csv_rules, top, processes, index=self.path_index)
+        self.pending_exact.extend(exact); self.pending_fuzzy.extend(fuzzy)
+
+    def on_item_expanded(self, index):
+        """展开时记下状态，并把上次保存时已展开的子孙一并展开"""
+        node = self.model.node_of(index); self.store.set_expanded(node, True)
+        if not self._bulk_expanding: self.restore_expanded(node)
+    def restore_expanded(self, node):
+        if node == ROOT and self.model.canFetchMore(QModelIndex()): self.model.fetchMore(QModelIndex())
+        self.expand_nodes(self.store.expanded_under(node))
+    def on_item_collapsed_recursive(self, index):
+        self.tree_view.collapsed.disconnect(self.on_item_collapsed_recursive); self.recursive_collapse(self.model.node_of(index)); self.tree_view.collapsed.connect(self.on_item_collapsed_recursive)
+    def recursive_collapse(self, node):
+        """折叠节点及其所有已展开的子孙：只处理展开集合里的节点"""
+        s = self.store
+        for n in s.expanded_under(node, False):
+            s.set_expanded(n, False)
+            if self.model.is_loaded(n): self.tree_view.collapse(self.model.node_index(n))
+        s.set_expanded(node, False)
+    def collapse_all(self):
+        self.tree_view.collapsed.disconnect(self.on_item_collapsed_recursive)
+        try:
+            self.tree_view.collapseAll()
+            for n in list(self.store.expanded_nodes): self.store.set_expanded(n, False)
+        finally: self.tree_view.collapsed.connect(self.on_item_collapsed_recursive)
     
-    def apply_color_by_code(self, item, code):
-        if not code or code.strip() == "":
-            for col in range(4): item.setBackground(col, QBrush(Qt.GlobalColor.transparent))
-            return
-        prefix = code.split('/')[0] if '/' in code else code
+    def brush_for_code(self, code):
+        """按编码前缀分配底色 (首次出现时登记)，返回共享画刷；无编码返回 None"""
+        if not code or code.strip() == "": return None
+        prefix = code_prefix(code)
         if prefix not in self.prefix_color_map:
             self.prefix_color_map[prefix] = self.next_color_index
             self.next_color_index = (self.next_color_index + 1) % len(COLOR_PALETTE)
-        color_idx = self.prefix_color_map[prefix]
-        bg_color = QColor(COLOR_PALETTE[color_idx])
-        for col in range(4): item.setBackground(col, QBrush(bg_color))
-    def on_item_changed(self, item, column):
-        if column == 1: self.apply_color_by_code(item, item.text(1)); self.is_dirty = True
-        elif column == 2 or column == 0: self.is_dirty = True; 
-        if column == 0: item.setData(0, Qt.ItemDataRole.UserRole, item.text(0))
-    def set_favorite_state(self, item, is_fav):
-        if is_fav: item.setText(3, "★"); item.setForeground(3, QBrush(QColor("#FFD700"))); item.setData(3, Qt.ItemDataRole.UserRole, True)
-        else: item.setText(3, "☆"); item.setForeground(3, QBrush(QColor("#BDBDBD"))); item.setData(3, Qt.ItemDataRole.UserRole, False)
-    def on_item_clicked(self, item, column):
-        if column == 3: current_state = item.data(3, Qt.ItemDataRole.UserRole); self.set_favorite_state(item, not current_state); self.is_dirty = True
+        return self.palette_brushes[self.prefix_color_map[prefix]]
+    def apply_color_by_code(self, node, code): self.brush_for_code(code); self.model.refresh_node(node)
+    def recolor_prefix(self, prefix):
+        """同前缀的编码换下一种底色：只刷新索引里该前缀下、已加载的行"""
+        if prefix not in self.prefix_color_map: return
+        self.prefix_color_map[prefix] = (self.prefix_color_map[prefix] + 1) % len(COLOR_PALETTE)
+        for n in self.path_index.find_prefix(prefix): self.model.refresh_node(n)
+    def on_item_changed(self, node, column):
+        if column == 1: self.apply_color_by_code(node, self.store.code(node)); self.is_dirty = True
+        elif column == 2 or column == 0: self.is_dirty = True
+    def set_favorite_state(self, node, is_fav): self.store.set_fav(node, is_fav); self.model.refresh_node(node)
+    def on_item_clicked(self, index):
+        if index.column() == 3: node = self.model.node_of(index); self.set_favorite_state(node, not self.store.fav[node]); self.is_dirty = True
+    @holding_sync
     def open_context_menu(self, pos):
-        item = self.tree_widget.itemAt(pos); menu = QMenu()
-        if item:
-            ac_rename = QAction("✏️ 重命名", self); ac_rename.triggered.connect(lambda: self.action_rename(item)); menu.addAction(ac_rename)
-            ac_del = QAction("🗑️ 删除", self); ac_del.triggered.connect(lambda: self.action_delete(item)); menu.addAction(ac_del)
-            is_folder = item.data(0, ROLE_IS_FOLDER)
-            if is_folder:
-                menu.addSeparator(); ac_add_folder = QAction("📂 新建子目录", self); ac_add_folder.triggered.connect(lambda: self.action_add_child(item, True)); menu.addAction(ac_add_folder); ac_add_file = QAction("📄 新建子文件", self); ac_add_file.triggered.connect(lambda: self.action_add_child(item, False)); menu.addAction(ac_add_file)
-            menu.addSeparator(); ac_copy = QAction("📋 复制路径", self); ac_copy.triggered.connect(lambda: QApplication.clipboard().setText(self.get_full_path(item))); menu.addAction(ac_copy)
-        else: ac_add_root = QAction("➕ 新建顶级类目", self); ac_add_root.triggered.connect(lambda: self.action_add_child(self.tree_widget.invisibleRootItem(), True)); menu.addAction(ac_add_root)
-        menu.exec(self.tree_widget.viewport().mapToGlobal(pos))
-    def action_rename(self, item):
-        text, ok = QInputDialog.getText(self, "重命名", "新名称:", text=item.text(0))
-        if ok and text: item.setText(0, text)
-    def action_delete(self, item):
-        reply = QMessageBox.question(self, "确认删除", f"确定要删除 '{item.text(0)}' 吗？", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
-        if reply == QMessageBox.StandardButton.Yes: (item.parent() or self.tree_widget.invisibleRootItem()).removeChild(item); self.is_dirty = True
+        index = self.tree_view.indexAt(pos); menu = QMenu()
+        if index.isValid():
+            node = self.model.node_of(index)
+            ac_rename = QAction("✏️ 重命名", self); ac_rename.triggered.connect(lambda: self.action_rename(node)); menu.addAction(ac_rename)
+            ac_del = QAction("🗑️ 删除", self); ac_del.triggered.connect(lambda: self.action_delete(node)); menu.addAction(ac_del)
+            if self.store.is_folder[node]:
+                menu.addSeparator(); ac_add_folder = QAction("📂 新建子目录", self); ac_add_folder.triggered.connect(lambda: self.action_add_child(node, True)); menu.addAction(ac_add_folder); ac_add_file = QAction("📄 新建子文件", self); ac_add_file.triggered.connect(lambda: self.action_add_child(node, False)); menu.addAction(ac_add_file)
+            if self.store.code_id[node]:
+                prefix = code_prefix(self.store.code(node))
+                ac_color = QAction(f"🎨 换底色 ({prefix}/*)", self); ac_color.triggered.connect(lambda: self.recolor_prefix(prefix)); menu.addAction(ac_color)
+                ac_same = QAction("🔎 同编码节点", self); ac_same.triggered.connect(lambda: self.search_input.setText("#" + self.store.code(node))); menu.addAction(ac_same)
+            menu.addSeparator(); ac_copy = QAction("📋 复制路径", self); ac_copy.triggered.connect(lambda: QApplication.clipboard().setText(self.get_full_path(node))); menu.addAction(ac_copy)
+        else: ac_add_root = QAction("➕ 新建顶级类目", self); ac_add_root.triggered.connect(lambda: self.action_add_child(ROOT, True)); menu.addAction(ac_add_root)
+        menu.addSeparator(); ac_fold = QAction("📕 全部折叠", self); ac_fold.triggered.connect(self.collapse_all); menu.addAction(ac_fold)
+        menu.exec(self.tree_view.viewport().mapToGlobal(pos))
+    def action_rename(self, node):
+        text, ok = QInputDialog.getText(self, "重命名", "新名称:", text=self.store.name(node))
+        if ok and text: self.model.setData(self.model.node_index(node), text)
+    def action_delete(self, node):
+        reply = QMessageBox.question(self, "确认删除", f"确定要删除 '{self.store.name(node)}' 吗？", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if reply == QMessageBox.StandardButton.Yes: self.model.remove_node(node); self.is_dirty = True
     def action_add_child(self, parent, is_folder):
         type_n = "目录" if is_folder else "文件"; text, ok = QInputDialog.getText(self, f"新建{type_n}", "名称:")
         if ok and text:
-            new = QTreeWidgetItem(parent); new.setText(0, text); new.setData(0, Qt.ItemDataRole.UserRole, text); self.set_item_type(new, is_folder); new.setFlags(new.flags() | Qt.ItemFlag.ItemIsEditable); self.set_favorite_state(new, False); parent.setExpanded(True); self.is_dirty = True
-    def serialize_tree(self, item):
-        children = []
-        for i in range(item.childCount()): children.append(self.serialize_tree(item.child(i)))
-        return {"name": item.data(0, Qt.ItemDataRole.UserRole), "code": item.text(1), "remark": item.text(2), "fav": item.data(3, Qt.ItemDataRole.UserRole), "is_folder": item.data(0, ROLE_IS_FOLDER), "expanded": item.isExpanded(), "children": children}
+            self.model.insert_node(parent, text, is_folder)
+            if parent != ROOT: self.tree_view.expand(self.model.node_index(parent))
+            self.is_dirty = True
     def open_project_manual(self):
-        path, _ = QFileDialog.getOpenFileName(self, "JSON", "", "JSON (*.json)")
+        path, _ = QFileDialog.getOpenFileName(self, "打开项目", "", f"项目 (*{PROJECT_EXT} *.json);;{PROJECT_FILTER}")
         if path: self.load_project_from_path(path)
-    def save_project(self):
-        if not self.current_project_path: path, _ = QFileDialog.getSaveFileName(self, "Save", "Team.json", "JSON (*.json)"); 
+    def save_project_as(self): self.save_project(ask=True)
+    def save_project(self, ask=False):
+        if ask or not self.current_project_path:
+            path, flt = QFileDialog.getSaveFileName(self, "Save", self.current_project_path or f"Team{PROJECT_EXT}", PROJECT_FILTER)
+            if path and not os.path.splitext(path)[1]: path += ".json" if "json" in flt.lower() else PROJECT_EXT
         else: path = self.current_project_path
         if not path: return
-        self.current_project_path = path; data = self.serialize_tree(self.tree_widget.invisibleRootItem())
-        with open(self.current_project_path, 'w', encoding='utf-8') as f: json.dump(data, f, ensure_ascii=False, indent=2)
+        with PROFILER.span("project.save"):
+            # 扩展名为 .json 时仍写旧版 JSON (便于与旧版本交换)，否则写二进制；都是临时文件 + 原子替换
+            self.current_project_path = path; base = save_project_file(self.store, path)
+            # 快照已包含全部修改：日志清空并以新快照为基准 (另存为时旧项目的日志原样保留)
+            ids = self.store.preorder_ids(); self.set_snapshot(path, self.store.snapshot(), base)
+            if self.journal and self.journal.path == journal_path(path): self.journal.reset(base, ids)
+            else:
+                if self.journal: self.journal.flush(); self.journal.detach()
+                self.start_journal(path, base); self.journal.reset(base, ids)
         self.settings.setValue("last_project_path", self.current_project_path); self.is_dirty = False; self.update_status(f"Saved: {os.path.basename(self.current_project_path)}")
     def load_last_session(self):
         p = self.settings.value("last_project_path")
         if p and os.path.exists(p): self.load_project_from_path(p)
     def reload_project(self):
-        if self.current_project_path: self.load_project_from_path(self.current_project_path)
+        if not self.current_project_path: return
+        if self.journal: self.journal.flush()
+        if self.base_store is None: self.load_project_from_path(self.current_project_path)
+        elif not self.sync_from_disk(): self.statusBar().showMessage("项目文件没有新的修改", 3000)
+    @PROFILER.profiled("project.sync")
+    def sync_from_disk(self):
+        """项目文件被别人覆盖保存后：按子树哈希与快照、本地树三方比对，只修补变化的子树；
+        两边改了同一处时保留本地值并列出冲突。返回是否合并了新内容"""
+        if self._sync_hold: self._sync_pending = True; return False   # 正在模态操作中，结束后再合并
+        path = self.current_project_path
+        if not path or self.base_store is None or not os.path.exists(path): return False
+        if path not in self.file_watcher.files(): self.file_watcher.addPath(path)   # 原子替换后部分平台会丢掉监视
+        try:
+            with open(path, 'rb') as f: data = f.read()
+            fp = data_fingerprint(data)
+            if fp == self.base_fp: return False   # 自己刚保存的，或内容没变
+            remote = parse_project(data)
+        except Exception as e: self.statusBar().showMessage(f"读取更新后的项目文件失败: {e}"); return False
+        if self.journal: self.journal.flush(); self.journal.detach()   # 合并进来的是远端状态，不记入本地修改日志
+        rh = compute_hashes(remote)
+        stats, conflicts = merge_remote(self.store, compute_hashes(self.store), self.base_store, self.base_hashes, remote, rh, TreeApplier(self))
+        lh = compute_hashes(self.store); self.base_store, self.base_hashes, self.base_fp = remote, rh, fp
+        if self.journal: ops, ids, next_id = diff_ops(self.store, lh, remote, rh); self.journal.rebase(fp, self.store, ids, next_id, ops)
+        self.is_dirty = lh[ROOT] != rh[ROOT]
+        self.update_status(f"协同: 已合并更新 (改 {stats['updated']} / 增 {stats['added']} / 删 {stats['removed']})" + ("，本地修改未保存" if self.is_dirty else ""))
+        if conflicts: self.show_conflicts(conflicts)
+        return True
+    @holding_sync
+    def show_conflicts(self, conflicts):
+        lines = [f"{c['path']} [{c['field']}] 本地: {c['local']} / 远端: {c['remote']}" for c in conflicts[:20]]
+        if len(conflicts) > 20: lines.append(f"... 共 {len(conflicts)} 处")
+        QMessageBox.warning(self, "合并冲突 (已保留本地修改)", "\n".join(lines))
+    def set_profiling(self, on):
+        PROFILER.enabled = bool(on); self.lbl_profile.setVisible(bool(on))
+        if on: self.profile_timer.start(PROFILE_REFRESH_MS)
+        else: self.profile_timer.stop()
+    def refresh_profile_label(self):
+        """状态栏显示最近一次操作的分阶段耗时，悬停看滚动历史"""
+        rec = PROFILER.last()
+        if rec is self._profile_shown: return
+        self._profile_shown = rec; self.lbl_profile.setText(profile_summary(rec))
+        self.lbl_profile.setToolTip("\n".join(profile_summary(r) for r in reversed(list(PROFILER.history)[-15:])))
+    def export_profile(self):
+        path, _ = QFileDialog.getSaveFileName(self, "导出性能分析", "profile.json", "Chrome Trace (*.json)")
+        if not path: return
+        try: n = PROFILER.export_chrome_trace(path); self.statusBar().showMessage(f"已导出 {n} 个区段 -> {os.path.basename(path)}", 5000)
+        except OSError as e: QMessageBox.warning(self, "导出失败", str(e))
     def update_status(self, t): self.lbl_status.setText(f"状态: {t}"); self.lbl_status.setStyleSheet("color: red; font-weight: bold;" if "未保存" in t else "color: green;")
-    def export_markdown(self):
-        path, _ = QFileDialog.getSaveFileName(self, "Export", "Catalog.txt", "Text (*.txt)")
-        if path:
-            with open(path, 'w', encoding='utf-8') as f: self.write_md(self.tree_widget.invisibleRootItem(), f, -1)
-            QMessageBox.information(self, "Success", "Done")
-    def write_md(self, item, f, level):
-        if level >= 0:
-            ind = "    " * level; rem = f" # {item.text(2)}" if item.text(2) else ""
-            f.write(f"{ind}- {item.text(0)} {item.text(1)}{rem}\n")
-        for i in range(item.childCount()): self.write_md(item.child(i), f, level + 1)
-    def normalize(self, t): return t.lower().replace(" ", "").replace(">", "/").replace("\\", "/")
-    def get_full_path(self, item):
-        p = []; c = item
-        while c: p.insert(0, c.data(0, Qt.ItemDataRole.UserRole)); c = c.parent()
-        return "/".join(p)
+    def export_catalog(self):
+        """在树的快照上由后台线程流式导出 (格式按扩展名)，界面可以继续编辑，进度框里可取消"""
+        path, chosen = QFileDialog.getSaveFileName(self, "导出", "Catalog.txt", ";;".join(FORMATS.values()))
+        if not path: return
+        if "." not in os.path.basename(path): path += "." + next((k for k, v in FORMATS.items() if v == chosen), "txt")
+        fmt = format_of(path)
+        top = ROOT
+        if self.act_export_subtree.isChecked():
+            idx = self.tree_view.currentIndex()
+            if not idx.isValid(): QMessageBox.warning(self, "提示", "请先选中要导出的节点"); return
+            top = self.model.node_of(idx)
+        snap = self.store.snapshot(); coded, favs = self.act_export_coded.isChecked(), self.act_export_fav.isChecked()
+        def job(report, is_cancelled):
+            try: return export_catalog(snap, path, fmt, top, coded, favs, progress=lambda done, total: report(done, total, f"已处理 {done} / {total} 个节点"), is_cancelled=is_cancelled)
+            except ExportCancelled: return None
+        def done(cnt):
+            if cnt is None: self.statusBar().showMessage("已取消导出", 3000)
+            else: QMessageBox.information(self, "完成", f"已导出 {cnt} 个节点 -> {path}")
+        self.run_task(job, "正在导出...", done)
+    def get_full_path(self, node): return self.store.full_path(node)
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()   # 打包成 exe 后多核匹配的子进程需要
     QApplication.setHighDpiScaleFactorRoundingPolicy(Qt.HighDpiScaleFactorRoundingPolicy.PassThrough)
     app = QApplication(sys.argv)
     app.setStyleSheet("""
         QWidget { background-color: #FFFFFF; color: #000000; }
-        QTreeWidget, QTableWidget, QListWidget { background-color: #FFFFFF; color: #000000; border: 1px solid #D0D0D0; alternate-background-color: #FFFFFF; }
+        QTreeView, QTableView, QListWidget { background-color: #FFFFFF; color: #000000; border: 1px solid #D0D0D0; alternate-background-color: #FFFFFF; }
         QLineEdit, QSpinBox, QTextEdit { background-color: #FFFFFF; color: #000000; border: 1px solid #C0C0C0; border-radius: 3px; padding: 2px; }
         QHeaderView::section { background-color: #F0F0F0; color: #000000; border: 1px solid #D8D8D8; padding: 4px; }
         QPushButton { background-color: #F5F5F5; color: #000000; border: 1px solid #C0C0C0; border-radius: 3px; padding: 5px 10px; }
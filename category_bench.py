@@ -0,0 +1,236 @@
+"""性能基准 (脚本，不是测试)：离屏 Qt 下跑主要界面操作，记录耗时与峰值内存并与 JSON 基线比较
+
+    python category_bench.py                                  # 自带 OPML + 10 万节点，对比 bench_baseline.json
+    python category_bench.py --sizes opml,100k,1m --noise 0.05 --update   # 重新记录基线
+    python category_bench.py --only csv --tolerance 0.3
+
+数据集：opml 为仓库自带的类目 OPML；100k / 1m (或任意整数) 为随机生成的树，
+同时生成覆盖全部叶子的 CSV，其中 --noise 比例的路径带 OCR 噪声 (末尾截断或错字)，走模糊匹配。
+峰值内存用 tracemalloc 另跑一遍测得 (只统计 Python 分配)，--no-memory 可跳过。
+有用例超出基线容差时退出码为 1。
+"""
+import os
+import sys
+import csv
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+from xml.sax.saxutils import quoteattr
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from category_core import CategoryStore, ROOT
+from category_project import save_project_file, journal_path
+
+DEFAULT_OPML = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Homedepot 后台类目路径.opml")
+DEFAULT_BASELINE = "bench_baseline.json"
+SEARCH_QUERIES = 50
+TIME_SLACK = 0.02    # 秒；极短用例的计时抖动不算退化
+OCR_SWAPS = {"o": "0", "l": "1", "i": "l", "e": "c", "s": "5", "a": "o", "n": "m", "u": "v"}
+
+
+# ---------- 数据集 ----------
+def make_tree(n, seed=0):
+    """按层随机生成约 n 个节点的树：每个目录 3~12 个子节点，名称由随机音节拼成"""
+    rng = random.Random(seed); syll = ["ka", "lo", "mi", "ter", "van", "dor", "pre", "sil", "qua", "ben", "tro", "fel", "gar", "nis", "por", "lum"]
+    words = sorted({"".join(rng.choice(syll) for _ in range(rng.randint(2, 4))).capitalize() for _ in range(3000)})
+    store = CategoryStore(); frontier = [ROOT]; k = 0
+    while k < n:
+        nxt = []
+        for p in frontier:
+            for _ in range(rng.randint(3, 12)):
+                if k >= n: break
+                nxt.append(store.add_node(p, " ".join(rng.sample(words, rng.randint(1, 3))) + f" {k}")); k += 1
+            if k >= n: break
+        frontier = nxt
+        rng.shuffle(frontier); frontier = frontier[:max(1, len(frontier) * 3 // 4)]   # 部分节点止步成叶子，深浅不一
+    for m in store.nodes(): store.is_folder[m] = 1 if store.child_count[m] else 0
+    return store
+
+
+def write_opml(store, path):
+    """流式写 OPML (先序 + 显式栈闭合标签)"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<opml version="2.0"><head/><body>\n'); stack = [ROOT]
+        for n in store.nodes():
+            while stack[-1] != store.parent[n]: stack.pop(); f.write("</outline>\n")
+            f.write(f"<outline text={quoteattr(store.name(n))}>"); stack.append(n)
+        f.write("</outline>\n" * (len(stack) - 1) + "</body></opml>\n")
+
+
+def ocr_noise(text, rng):
+    """模拟 OCR：末尾截掉 1~3 个字符，或把一个字符换成形近字符"""
+    if len(text) > 6 and rng.random() < 0.5: return text[:-rng.randint(1, 3)]
+    pos = [i for i, ch in enumerate(text) if ch.lower() in OCR_SWAPS]
+    if not pos: return text[:-1]
+    i = rng.choice(pos); return text[:i] + OCR_SWAPS[text[i].lower()] + text[i + 1:]
+
+
+def write_csv(store, path, noise, seed=0):
+    """每个叶子一行 类目途径/分类，noise 比例的路径末级名称加 OCR 噪声；返回行数"""
+    rng = random.Random(seed); rows = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        w = csv.writer(f); w.writerow(["类目途径", "分类"])
+        for n in store.nodes():
+            if store.is_folder[n]: continue
+            parts = store.path_parts(n)
+            if rng.random() < noise: parts[-1] = ocr_noise(parts[-1], rng)
+            w.writerow(["/".join(parts), f"B{rows % 97}/{rows}"]); rows += 1
+    return rows
+
+
+def prepare(size, workdir, noise, seed):
+    """生成/复制一套数据：opml、项目文件、精确 CSV、带噪 CSV 与搜索词"""
+    d = os.path.join(workdir, size); os.makedirs(d, exist_ok=True)
+    opml = os.path.join(d, "tree.opml")
+    if size == "opml":
+        from category_opml import load_opml
+        shutil.copyfile(DEFAULT_OPML, opml); store = load_opml(opml)
+    else:
+        store = make_tree(parse_size(size), seed); write_opml(store, opml)
+    proj = os.path.join(d, "tree.hdproj"); save_project_file(store, proj)
+    rng = random.Random(seed); leaves = [n for n in store.nodes() if not store.is_folder[n]]
+    queries = [ocr_noise(store.name(n), rng) for n in rng.sample(leaves, min(SEARCH_QUERIES, len(leaves)))]
+    ds = {"opml": opml, "project": proj, "csv_exact": os.path.join(d, "exact.csv"), "csv_fuzzy": os.path.join(d, "fuzzy.csv"),
+          "markdown": os.path.join(d, "export.txt"), "queries": queries, "nodes": len(store)}
+    ds["rows"] = write_csv(store, ds["csv_exact"], 0.0, seed); write_csv(store, ds["csv_fuzzy"], noise, seed)
+    return ds
+
+
+def parse_size(s):
+    s = s.strip().lower(); mult = {"k": 1000, "m": 1000000}.get(s[-1:], 1)
+    return int(float(s[:-1] if mult > 1 else s) * mult)
+
+
+# ---------- 计时 ----------
+def measure(fn, setup=None, repeat=1, memory=True):
+    times = []
+    for _ in range(repeat):
+        if setup: setup()
+        t = time.perf_counter(); fn(); times.append(time.perf_counter() - t)
+    peak = None
+    if memory:
+        if setup: setup()
+        tracemalloc.start()
+        try: fn(); peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally: tracemalloc.stop()
+    return {"time": round(min(times), 4), "peak_mb": None if peak is None else round(peak, 2)}
+
+
+class GuiBench:
+    """一个离屏 CategoryApp 实例；弹窗全部替换成直接返回，设置写到临时 ini 不碰用户配置"""
+    def __init__(self, workdir, parallel=False):
+        from PyQt6.QtWidgets import QApplication, QFileDialog, QMessageBox
+        from PyQt6.QtCore import QSettings
+        import category_app as ca
+        self.ca = ca; self.app = QApplication.instance() or QApplication(sys.argv); self.paths = {}
+        QFileDialog.getOpenFileName = staticmethod(lambda *a, **k: (self.paths["open"], ""))
+        QFileDialog.getOpenFileNames = staticmethod(lambda *a, **k: ([self.paths["open"]], ""))
+        QFileDialog.getSaveFileName = staticmethod(lambda *a, **k: (self.paths["save"], ""))
+        for name in ("information", "warning", "critical"): setattr(QMessageBox, name, staticmethod(lambda *a, **k: None))
+        ca.MatchReviewDialog.exec = lambda dlg: (dlg.accept_selection(), 1)[1]   # 模糊匹配全部采纳
+        ca.CategoryApp.load_last_session = lambda w: None
+        self.w = ca.CategoryApp(); self.w.settings = QSettings(os.path.join(workdir, "bench.ini"), QSettings.Format.IniFormat)
+        self.w.chk_parallel.setChecked(parallel)
+
+    def wait_task(self):
+        while self.w._task is not None: self.app.processEvents(); time.sleep(0.005)
+
+    def fresh_project(self, proj):
+        """重新加载干净的项目 (丢弃上一轮留下的修改日志，避免被回放)"""
+        w = self.w
+        if w.journal: w.journal.discard(); w.journal = None
+        if os.path.exists(journal_path(proj)): os.remove(journal_path(proj))
+        w.load_project_from_path(proj)
+
+    def cases(self, ds):
+        w = self.w; p = self.paths
+        def opml_setup(): p["open"] = ds["opml"]
+        def opml_run(): w.new_project_from_opml(); self.wait_task()
+        def load_run(): self.fresh_project(ds["project"])
+        def search_run():
+            for q in ds["queries"]: w.search_input.setText(q); w.perform_fuzzy_search()
+        def csv_setup(key):
+            def setup():
+                self.fresh_project(ds["project"]); p["open"] = ds[key]
+                w.spin_start.setValue(2); w.spin_end.setValue(min(w.spin_end.maximum(), ds["rows"] + 1))
+            return setup
+        def export_setup(): self.fresh_project(ds["project"]); p["save"] = ds["markdown"]
+        def export_run(): w.export_catalog(); self.wait_task()
+        return [
+            ("new_project_from_opml", opml_run, opml_setup),
+            ("load_project_from_path", load_run, None),
+            ("save_project", w.save_project, lambda: self.fresh_project(ds["project"])),
+            ("perform_fuzzy_search", search_run, lambda: self.fresh_project(ds["project"])),
+            ("load_csv_and_update/exact", w.btn_csv.click, csv_setup("csv_exact")),   # 经由真实按钮，连同信号参数一起走一遍
+            ("load_csv_and_update/fuzzy", w.btn_csv.click, csv_setup("csv_fuzzy")),
+            ("export_markdown", export_run, export_setup),
+        ]
+
+    def close(self):
+        w = self.w
+        if w.journal: w.journal.discard(); w.journal = None
+        w.close()
+
+
+# ---------- 基线比较 ----------
+def compare(results, baseline, tol, mem_tol):
+    """返回超出容差的 [(用例, 说明)]；基线里没有的用例跳过"""
+    bad = []
+    for key, r in results.items():
+        b = baseline.get(key)
+        if not b: continue
+        if r["time"] > b["time"] * (1 + tol) + TIME_SLACK: bad.append((key, f"耗时 {b['time']:.3f}s -> {r['time']:.3f}s"))
+        if r.get("peak_mb") is not None and b.get("peak_mb") and r["peak_mb"] > b["peak_mb"] * (1 + mem_tol) + 1:
+            bad.append((key, f"峰值内存 {b['peak_mb']:.1f}MB -> {r['peak_mb']:.1f}MB"))
+    return bad
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="类目工具性能基准")
+    ap.add_argument("--sizes", default="opml,100k", help="逗号分隔：opml / 100k / 1m / 任意整数")
+    ap.add_argument("--noise", type=float, default=0.02, help="带噪 CSV 中 OCR 噪声路径的比例")
+    ap.add_argument("--only", help="只跑名称包含此串的用例")
+    ap.add_argument("--repeat", type=int, default=1, help="每个用例计时几次取最小值")
+    ap.add_argument("--no-memory", action="store_true", help="不测峰值内存 (省掉 tracemalloc 那一遍)")
+    ap.add_argument("--parallel", action="store_true", help="勾选多核匹配")
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE); ap.add_argument("--update", action="store_true", help="把本次结果写入基线")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="耗时允许比基线慢的比例")
+    ap.add_argument("--mem-tolerance", type=float, default=0.25, help="峰值内存允许比基线高的比例")
+    ap.add_argument("--seed", type=int, default=0); ap.add_argument("--keep", help="数据集目录 (保留生成的文件)")
+    args = ap.parse_args(argv)
+
+    workdir = args.keep or tempfile.mkdtemp(prefix="catbench-"); os.makedirs(workdir, exist_ok=True)
+    results = {}; bench = GuiBench(workdir, args.parallel)
+    try:
+        for size in [s.strip() for s in args.sizes.split(",") if s.strip()]:
+            t = time.perf_counter(); ds = prepare(size, workdir, args.noise, args.seed)
+            print(f"[{size}] {ds['nodes']} 个节点，CSV {ds['rows']} 行，准备 {time.perf_counter() - t:.1f}s", flush=True)
+            for name, fn, setup in bench.cases(ds):
+                if args.only and args.only not in name: continue
+                key = f"{size}/{name}"; r = results[key] = measure(fn, setup, args.repeat, not args.no_memory)
+                print(f"  {name:<28} {r['time']:>9.3f}s" + ("" if r["peak_mb"] is None else f" {r['peak_mb']:>9.1f}MB"), flush=True)
+    finally:
+        bench.close()
+        if not args.keep: shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f: baseline = json.load(f).get("results", {})
+    bad = compare(results, baseline, args.tolerance, args.mem_tolerance)
+    if args.update:
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({"python": sys.version.split()[0], "noise": args.noise, "results": baseline}, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"基线已写入 {args.baseline}")
+    elif not baseline: print(f"没有基线 {args.baseline}，加 --update 记录本次结果")
+    for key, msg in bad: print(f"退化: {key}: {msg}")
+    return 1 if bad and not args.update else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
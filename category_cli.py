@@ -0,0 +1,126 @@
+"""命令行批处理 (不启动 Qt)：OPML 转项目、按 CSV/XLSX 批量写编码、导出、搜索
+
+    python category_cli.py new 类目.opml -o Team.hdproj
+    python category_cli.py apply Team.hdproj a.csv b.xlsx --start 2 --end 5000 --accept 0.9 -j 4
+    python category_cli.py export Team.hdproj -o Catalog.txt [--top "Appliances/Refrigerators"]
+    python category_cli.py export Team.hdproj -o Coded.xlsx --coded       # 按扩展名选格式：txt/md、csv、xlsx、opml
+    python category_cli.py search Team.hdproj "refrig/french door" -n 10
+    python category_cli.py search Team.hdproj "#P3/12"              # 按编码查 (不含 “/” 时按编码前缀)
+    python category_cli.py dups Team.hdproj                         # 列出重复编码 / 重复路径
+    python category_cli.py --profile trace.json apply ...      # 记录分阶段耗时，导出 Chrome trace
+
+重依赖 (pandas / numpy / openpyxl) 只在 apply (以及导出 xlsx) 时导入。
+"""
+import sys
+import csv
+import argparse
+
+from category_core import ROOT
+from category_project import load_project_file, save_project_file
+from category_profile import PROFILER, summary
+
+
+def _top(store, path):
+    from category_ops import find_path
+    if not path: return ROOT
+    n = find_path(store, path)
+    if n is None: raise SystemExit(f"找不到路径: {path}")
+    return n
+
+
+def cmd_new(args):
+    from category_opml import load_opml
+    store = load_opml(args.opml); save_project_file(store, args.output)
+    print(f"{len(store)} 个节点 -> {args.output}")
+
+
+def cmd_apply(args):
+    from category_ops import read_rules, scan_matches, apply_codes
+    store = load_project_file(args.project); top = _top(store, args.top)
+    rules = read_rules(args.tables, max(0, args.start - 2), None if args.end is None else args.end - 2)
+    if not args.jobs and not args.no_fuzzy:
+        from category_match import default_processes
+        args.jobs = default_processes()
+    exact, fuzzy, _ = scan_matches(store, rules, top, args.jobs, fuzzy=not args.no_fuzzy)
+    ok = [m['same_parent'] and m['score'] >= args.accept for m in fuzzy]   # 只在同一父路径下按叶子相似度采纳
+    accepted = [m for m, a in zip(fuzzy, ok) if a]; pending = [m for m, a in zip(fuzzy, ok) if not a]
+    cnt = apply_codes(store, exact + accepted)
+    out = args.output or args.project
+    if cnt or out != args.project: save_project_file(store, out)
+    print(f"规则 {len(rules)}，精确 {len(exact)}，模糊 {len(fuzzy)} (自动采纳 {len(accepted)})，更新 {cnt} -> {out}")
+    if args.pending and pending:
+        with open(args.pending, 'w', newline='', encoding='utf-8-sig') as f:
+            w = csv.writer(f); w.writerow(["树路径", "CSV 路径", "编码", "类型", "相似度", "父路径相同"])
+            for m in pending: w.writerow([m['full_path'], m['csv_path'], m['code'], m['match_type'], f"{m['score']:.3f}", "是" if m['same_parent'] else "否"])
+        print(f"待人工确认 {len(pending)} 条 -> {args.pending}")
+
+
+def cmd_export(args):
+    from category_export import export_catalog
+    store = load_project_file(args.project); top = _top(store, args.top)
+    cnt = export_catalog(store, args.output, top=top, coded_only=args.coded, favorites_only=args.fav)
+    print(f"已导出 {cnt} 个节点 -> {args.output}")
+
+
+def cmd_search(args):
+    from category_search import SearchIndex
+    store = load_project_file(args.project)
+    if args.query.startswith("#"):
+        from category_index import PathIndex
+        idx = PathIndex(store); code = args.query[1:].strip(); nodes = idx.find_code(code)
+        if not nodes and "/" not in code: nodes = sorted(idx.find_prefix(code))
+        for n in nodes[:args.limit]: print(f"{store.code(n)}\t{store.full_path(n)}")
+        return
+    for r in SearchIndex(store).search(args.query, args.limit): print(f"{r['score']:.2f}\t{r['path']}\t{store.code(r['node'])}")
+
+
+def cmd_dups(args):
+    from category_index import PathIndex
+    store = load_project_file(args.project); idx = PathIndex(store)
+    codes, paths = idx.duplicate_codes(), idx.duplicate_paths()
+    for code, nodes in codes.items():
+        for n in nodes: print(f"编码重复\t{code}\t{store.full_path(n)}")
+    for nodes in paths.values():
+        for n in nodes: print(f"路径重复\t{store.code(n)}\t{store.full_path(n)}")
+    print(f"重复编码 {len(codes)} 组，重复路径 {len(paths)} 组", file=sys.stderr)
+
+
+def build_parser():
+    p = argparse.ArgumentParser(prog="category_cli", description="Homedepot 类目工具命令行批处理")
+    p.add_argument("--profile", metavar="TRACE_JSON", help="记录各阶段耗时与计数器并导出 Chrome trace")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("new", help="OPML 转项目文件"); s.add_argument("opml"); s.add_argument("-o", "--output", required=True, help=".hdproj 或 .json")
+    s.set_defaults(func=cmd_new)
+    s = sub.add_parser("apply", help="按 CSV/XLSX 的 类目途径/分类 写入编码")
+    s.add_argument("project"); s.add_argument("tables", nargs="+")
+    s.add_argument("--start", type=int, default=2, help="起始行 (Excel 行号，表头为第 1 行)"); s.add_argument("--end", type=int, default=None, help="结束行 (含)")
+    s.add_argument("--accept", type=float, default=1.01, help="模糊匹配父路径相同且叶子名相似度达到此值时自动采纳 (默认不采纳)")
+    s.add_argument("--no-fuzzy", action="store_true", help="只做精确匹配"); s.add_argument("-j", "--jobs", type=int, default=0, help="模糊匹配进程数 (默认 CPU 数-1)")
+    s.add_argument("--top", help="只处理此路径下的子树"); s.add_argument("--pending", help="未采纳的模糊匹配写到此 CSV")
+    s.add_argument("-o", "--output", help="输出项目文件 (默认覆盖原文件)")
+    s.set_defaults(func=cmd_apply)
+    s = sub.add_parser("export", help="导出缩进文本 / CSV / XLSX / OPML (按 -o 的扩展名)"); s.add_argument("project"); s.add_argument("-o", "--output", required=True)
+    s.add_argument("--top", help="只导出此路径下的子树"); s.add_argument("--coded", action="store_true", help="只导出有编码的叶子")
+    s.add_argument("--fav", action="store_true", help="只导出收藏的节点")
+    s.set_defaults(func=cmd_export)
+    s = sub.add_parser("search", help="模糊搜索节点 (“#编码” 按编码查)"); s.add_argument("project"); s.add_argument("query"); s.add_argument("-n", "--limit", type=int, default=20)
+    s.set_defaults(func=cmd_search)
+    s = sub.add_parser("dups", help="列出重复的编码和重复的路径"); s.add_argument("project")
+    s.set_defaults(func=cmd_dups)
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    PROFILER.enabled = PROFILER.enabled or bool(args.profile)
+    try:
+        with PROFILER.span(f"cli.{args.cmd}"): args.func(args)
+    except (OSError, ValueError) as e: print(f"错误: {e}", file=sys.stderr); return 1
+    if args.profile: PROFILER.export_chrome_trace(args.profile); print(summary(PROFILER.last()), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
+    sys.exit(main())
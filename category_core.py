@@ -0,0 +1,238 @@
+"""类目树核心层 (无 GUI 依赖)：紧凑数组存储，供界面模型懒加载"""
+from array import array
+
+ROOT = 0        # 不可见根节点
+NO_NODE = -1
+
+
+def normalize(t): return t.lower().replace(" ", "").replace(">", "/").replace("\\", "/")
+
+
+class StringTable:
+    """字符串驻留表：相同的名称/编码/备注只存一份，列里只记下标"""
+    def __init__(self):
+        self.strings = [""]; self._index = {"": 0}
+
+    def intern(self, s):
+        i = self._index.get(s)
+        if i is None:
+            i = len(self.strings); self.strings.append(s); self._index[s] = i
+        return i
+
+    def __getitem__(self, i): return self.strings[i]
+    def __len__(self): return len(self.strings)
+
+
+class CategoryStore:
+    """紧凑类目树：parent / first_child / next_sibling 索引数组 + 驻留字符串列。
+    节点用整数 id 表示，0 为不可见根；删除只做标记，保存时自然压缩。"""
+    def __init__(self):
+        self.strings = StringTable()
+        self.parent = array('i', [NO_NODE]); self.first_child = array('i', [NO_NODE]); self.last_child = array('i', [NO_NODE])
+        self.next_sibling = array('i', [NO_NODE]); self.prev_sibling = array('i', [NO_NODE]); self.child_count = array('i', [0])
+        self.name_id = array('i', [0]); self.code_id = array('i', [0]); self.remark_id = array('i', [0])
+        self.fav = bytearray(1); self.is_folder = bytearray(b'\x01'); self.expanded = bytearray(1); self.alive = bytearray(b'\x01')
+        self.size = 0  # 存活节点数 (不含根)
+        self.expanded_nodes = set()   # expanded 标记为 1 的节点，折叠/恢复展开只需看这里，不必遍历子树
+        self.listeners = []  # 变更回调 fn(event, node, old)：event 为 add/remove/name/code/remark/fav/folder
+
+    def _notify(self, event, n, old=None):
+        for fn in self.listeners: fn(event, n, old)
+
+    def __len__(self): return self.size
+    def capacity(self): return len(self.parent)
+
+    # ---------- 读取 ----------
+    def name(self, n): return self.strings[self.name_id[n]]
+    def code(self, n): return self.strings[self.code_id[n]]
+    def remark(self, n): return self.strings[self.remark_id[n]]
+
+    def children(self, n):
+        c = self.first_child[n]
+        while c != NO_NODE: yield c; c = self.next_sibling[c]
+
+    def child_list(self, n): return list(self.children(n))
+
+    def iter_subtree(self, n, include_self=True):
+        """先序遍历 (非递归)，沿兄弟/父指针前进，不受树深限制"""
+        if include_self: yield n
+        first, nxt, par = self.first_child, self.next_sibling, self.parent
+        c = first[n]
+        while c != NO_NODE:
+            yield c
+            if first[c] != NO_NODE: c = first[c]; continue
+            while c != n and nxt[c] == NO_NODE: c = par[c]
+            if c == n: return
+            c = nxt[c]
+
+    def nodes(self): return self.iter_subtree(ROOT, False)
+
+    def ancestors(self, n):
+        """由近及远的祖先 (不含不可见根)"""
+        p = self.parent[n]
+        while p != ROOT and p != NO_NODE: yield p; p = self.parent[p]
+
+    def expanded_under(self, top, visible_only=True):
+        """top 子树内 (不含 top) 记为展开的节点，父节点在前；visible_only 时只取中间祖先也都展开的。
+        只扫展开集合，代价 O(展开数 × 深度)，与子树大小无关"""
+        out = []; par, exp = self.parent, self.expanded
+        for n in self.expanded_nodes:
+            if n == top: continue
+            p = par[n]; d = 1
+            while p != top:
+                if p == ROOT or p == NO_NODE or (visible_only and not exp[p]): d = 0; break
+                p = par[p]; d += 1
+            if d: out.append((d, n))
+        out.sort(); return [n for _, n in out]
+
+    def path_parts(self, n):
+        p = []
+        while n != ROOT and n != NO_NODE: p.append(self.name(n)); n = self.parent[n]
+        p.reverse(); return p
+
+    def full_path(self, n): return "/".join(self.path_parts(n))
+
+    # ---------- 修改 ----------
+    def add_node(self, parent, name, code="", remark="", fav=False, is_folder=False, expanded=False):
+        """在 parent 末尾追加子节点，返回新 id"""
+        n = len(self.parent); prev = self.last_child[parent]; intern = self.strings.intern
+        self.parent.append(parent); self.first_child.append(NO_NODE); self.last_child.append(NO_NODE)
+        self.next_sibling.append(NO_NODE); self.prev_sibling.append(prev); self.child_count.append(0)
+        self.name_id.append(intern(name)); self.code_id.append(intern(code)); self.remark_id.append(intern(remark))
+        self.fav.append(1 if fav else 0); self.is_folder.append(1 if is_folder else 0); self.expanded.append(1 if expanded else 0); self.alive.append(1)
+        if expanded: self.expanded_nodes.add(n)
+        if prev == NO_NODE: self.first_child[parent] = n
+        else: self.next_sibling[prev] = n
+        self.last_child[parent] = n; self.child_count[parent] += 1; self.size += 1
+        if self.listeners: self._notify("add", n)
+        return n
+
+    def remove(self, n):
+        """摘除节点及其子树，返回被删除的 id 列表"""
+        p, prev, nxt = self.parent[n], self.prev_sibling[n], self.next_sibling[n]
+        if prev == NO_NODE: self.first_child[p] = nxt
+        else: self.next_sibling[prev] = nxt
+        if nxt == NO_NODE: self.last_child[p] = prev
+        else: self.prev_sibling[nxt] = prev
+        self.child_count[p] -= 1
+        removed = list(self.iter_subtree(n))
+        for r in removed: self.alive[r] = 0
+        if self.expanded_nodes: self.expanded_nodes.difference_update(removed)
+        self.next_sibling[n] = self.prev_sibling[n] = NO_NODE; self.size -= len(removed)
+        if self.listeners: self._notify("remove", n, removed)
+        return removed
+
+    def _set_str(self, col, event, n, s):
+        old = col[n]; col[n] = self.strings.intern(s)
+        if self.listeners and old != col[n]: self._notify(event, n, old)
+
+    def set_name(self, n, s): self._set_str(self.name_id, "name", n, s)
+    def set_code(self, n, s): self._set_str(self.code_id, "code", n, s)
+    def set_remark(self, n, s): self._set_str(self.remark_id, "remark", n, s)
+
+    def set_fav(self, n, v):
+        old = self.fav[n]; self.fav[n] = 1 if v else 0
+        if self.listeners and old != self.fav[n]: self._notify("fav", n, old)
+
+    def set_expanded(self, n, v):
+        """界面展开状态 (随项目保存，不记入修改日志)"""
+        self.expanded[n] = 1 if v else 0
+        if v: self.expanded_nodes.add(n)
+        else: self.expanded_nodes.discard(n)
+
+    def set_folder(self, n, v):
+        old = self.is_folder[n]; self.is_folder[n] = 1 if v else 0
+        if self.listeners and old != self.is_folder[n]: self._notify("folder", n, old)
+
+    # ---------- 导入 / 导出 ----------
+    def add_xml_children(self, parent, xml_node):
+        """把 OPML outline 元素挂到 parent 下 (显式栈，无递归)；无文字的节点连同子树跳过"""
+        stack = [(parent, iter(xml_node))]; added = []
+        while stack:
+            p, it = stack[-1]; child = next(it, None)
+            if child is None: stack.pop(); continue
+            t = child.get('text') or child.get('title')
+            if not t: continue
+            n = self.add_node(p, t); added.append(n); stack.append((n, iter(child)))
+        for n in added: self.is_folder[n] = 1 if self.child_count[n] > 0 else 0
+        return len(added)
+
+    def add_dict_children(self, parent, data_list):
+        """载入项目 JSON 的 children 列表 (兼容旧版缺字段的数据)"""
+        if not isinstance(data_list, list): return 0
+        stack = [(parent, iter(data_list))]; count = 0
+        while stack:
+            p, it = stack[-1]; node = next(it, None)
+            if node is None: stack.pop(); continue
+            if not isinstance(node, dict): continue
+            kids = node.get("children") or []
+            is_folder = node.get("is_folder", len(kids) > 0)
+            n = self.add_node(p, node.get("name") or "", node.get("code") or "", node.get("remark") or "",
+                              bool(node.get("fav")), bool(is_folder), bool(node.get("expanded")))
+            count += 1
+            if isinstance(kids, list) and kids: stack.append((n, iter(kids)))
+        return count
+
+    @classmethod
+    def from_columns(cls, strings, parent, name_id, code_id, remark_id, fav, is_folder, expanded):
+        """由列数组直接建树 (二进制项目文件用)：节点按先序编号 1..n，parent 引用更小的编号，0 为根"""
+        store = cls(); n = len(parent)
+        if not strings or strings[0] != "": raise ValueError("字符串表格式错误")
+        store.strings.strings = strings; store.strings._index = {t: i for i, t in enumerate(strings)}
+        store.parent = array('i', [NO_NODE]); store.parent.extend(parent)
+        first = array('i', [NO_NODE]) * (n + 1); last = array('i', [NO_NODE]) * (n + 1)
+        nxt = array('i', [NO_NODE]) * (n + 1); prev = array('i', [NO_NODE]) * (n + 1); cnt = array('i', [0]) * (n + 1)
+        par = store.parent; ns = len(strings)
+        for c in range(1, n + 1):
+            p = par[c]
+            if not 0 <= p < c: raise ValueError(f"节点 {c} 的父节点 {p} 无效")
+            l = last[p]
+            if l == NO_NODE: first[p] = c
+            else: nxt[l] = c; prev[c] = l
+            last[p] = c; cnt[p] += 1
+        for col in (name_id, code_id, remark_id):
+            if n and not (0 <= min(col) and max(col) < ns): raise ValueError("字符串下标越界")
+        store.first_child, store.last_child, store.next_sibling, store.prev_sibling, store.child_count = first, last, nxt, prev, cnt
+        store.name_id = array('i', [0]) + name_id; store.code_id = array('i', [0]) + code_id; store.remark_id = array('i', [0]) + remark_id
+        store.fav = bytearray(1) + fav; store.is_folder = bytearray(b'\x01') + is_folder; store.expanded = bytearray(1) + expanded
+        store.alive = bytearray(b'\x01') * (n + 1); store.size = n
+        e = store.expanded; i = e.find(1, 1)
+        while i != -1: store.expanded_nodes.add(i); i = e.find(1, i + 1)
+        return store
+
+    def preorder_ids(self):
+        """当前 id -> 保存后重新加载时的 id (存活节点先序 1..n)，返回 (映射数组, n)"""
+        ids = array('i', [0]) * self.capacity(); k = 0
+        for n in self.nodes(): k += 1; ids[n] = k
+        return ids, k
+
+    def snapshot(self):
+        """按值复制的独立副本 (不带监听器)：后台线程读它时界面可以继续编辑原树"""
+        s = CategoryStore(); s.strings.strings = list(self.strings.strings); s.strings._index = dict(self.strings._index)
+        for k in ("parent", "first_child", "last_child", "next_sibling", "prev_sibling", "child_count", "name_id", "code_id", "remark_id",
+                  "fav", "is_folder", "expanded", "alive"): setattr(s, k, getattr(self, k)[:])
+        s.size = self.size; s.expanded_nodes = set(self.expanded_nodes)
+        return s
+
+    def to_columns(self):
+        """导出紧凑列 (只含存活节点，先序重新编号，字符串表去掉已不用的串)；与 from_columns 互逆"""
+        strings = [""]; index = {"": 0}; new_id = self.preorder_ids()[0]
+        parent = array('i'); name_id = array('i'); code_id = array('i'); remark_id = array('i')
+        fav = bytearray(); is_folder = bytearray(); expanded = bytearray()
+        def sid(i):
+            t = self.strings[i]; j = index.get(t)
+            if j is None: j = index[t] = len(strings); strings.append(t)
+            return j
+        for n in self.nodes():
+            parent.append(new_id[self.parent[n]])
+            name_id.append(sid(self.name_id[n])); code_id.append(sid(self.code_id[n])); remark_id.append(sid(self.remark_id[n]))
+            fav.append(self.fav[n]); is_folder.append(self.is_folder[n]); expanded.append(self.expanded[n])
+        return strings, parent, name_id, code_id, remark_id, fav, is_folder, expanded
+
+    @classmethod
+    def from_data(cls, data):
+        """项目数据可能是旧版的列表，也可能是新版保存的根节点字典"""
+        store = cls()
+        if isinstance(data, list): store.add_dict_children(ROOT, data)
+        elif isinstance(data, dict): store.add_dict_children(ROOT, data.get("children", []))
+        return store
@@ -0,0 +1,144 @@
+"""流式导出 (无 GUI 依赖)：缩进文本 / CSV / XLSX / OPML，边遍历边成批写出，内存与树大小无关
+
+    export_catalog(store.snapshot(), "Catalog.csv", top=n, coded_only=True, progress=..., is_cancelled=...)
+
+CSV / XLSX 每个节点一行 (类目途径, 分类, 备注)，表头与导入 CSV 时认的列名一致，可直接拿回来再导入。
+过滤 (只要有编码的叶子 / 只要收藏) 时 CSV / XLSX 只有命中的行，缩进文本和 OPML 会补上命中节点的各级祖先以保持层级。
+先写临时文件再替换目标，取消或出错不会留下半个文件。openpyxl 只在导出 XLSX 时导入。
+"""
+import os
+import io
+import csv
+from xml.sax.saxutils import quoteattr
+
+from category_core import ROOT
+from category_project import atomic_write
+from category_profile import PROFILER as prof
+
+EXPORT_BATCH = 5000   # 每这么多节点写一次缓冲、回报进度、检查取消
+FORMATS = {"txt": "缩进文本 (*.txt *.md)", "csv": "CSV (*.csv)", "xlsx": "Excel (*.xlsx)", "opml": "OPML (*.opml)"}
+_XML_WS = {"\n": "&#10;", "\r": "&#13;", "\t": "&#9;"}   # 属性值里的换行/制表符要转义，否则读回来变成空格
+HEADER = ["类目途径", "分类", "备注"]   # 前两列即 category_ingest 的 PATH_COL / CODE_COL (那边导入 pandas，这里不引用)
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def format_of(path):
+    """按扩展名判断格式，未知扩展名按缩进文本"""
+    ext = path.rsplit(".", 1)[-1].lower() if "." in path else ""
+    return "txt" if ext == "md" else ext if ext in FORMATS else "txt"
+
+
+def walk(store, top=ROOT, keep=None, nodes=None):
+    """先序遍历 top 的子孙 (非递归)，产出 (是否开始, 节点, 深度相对 top, 全路径)：开始事件祖先在前，结束事件在其子孙之后。
+    给了 keep 时只产出 keep(节点) 为真的节点及其祖先；祖先在遇到第一个命中的子孙时才补发。
+    nodes 可替换默认的 store.iter_subtree(top, False) (须同样是先序)，用于计数回报进度"""
+    par = store.parent; stack = []; paths = []; shown = 0   # stack 前 shown 个已发出开始事件
+    base = store.full_path(top) + "/" if top != ROOT else ""
+    for n in (store.iter_subtree(top, False) if nodes is None else nodes):
+        p = par[n]
+        while stack and stack[-1] != p:
+            m = stack.pop(); paths.pop()
+            if len(stack) < shown: shown = len(stack); yield False, m, shown, None
+        paths.append((paths[-1] + "/" if paths else base) + store.name(n)); stack.append(n)
+        if keep is None or keep(n):
+            while shown < len(stack): yield True, stack[shown], shown, paths[shown]; shown += 1
+    while stack:
+        m = stack.pop()
+        if len(stack) < shown: shown = len(stack); yield False, m, shown, None
+
+
+class _TextWriter:
+    """缩进列表：每个节点一行 “- 名称 编码 # 备注”"""
+    mode = "text"; nested = True   # nested：按层级输出，过滤时要补祖先
+    def __init__(self, store, f): self.store = store; self.f = f; self.buf = []
+    def open(self, n, depth, path):
+        s = self.store; rem = f" # {s.remark(n)}" if s.remark_id[n] else ""
+        self.buf.append(f"{'    ' * depth}- {s.name(n)} {s.code(n)}{rem}\n")
+    def close(self, n, depth): pass
+    def flush(self): self.f.write("".join(self.buf)); self.buf.clear()
+    def finish(self): self.flush()
+
+
+class _OpmlWriter(_TextWriter):
+    """outline 嵌套；编码与备注放在 _note 里 (幕布等大纲工具导入时显示为备注)，再次读入只取 text"""
+    def __init__(self, store, f):
+        super().__init__(store, f)
+        self.buf.append('<?xml version="1.0" encoding="UTF-8"?>\n<opml version="2.0">\n  <head><title>Catalog</title></head>\n  <body>\n')
+    def open(self, n, depth, path):
+        s = self.store; note = " # ".join(t for t in (s.code(n), s.remark(n)) if t)
+        attrs = f"text={quoteattr(s.name(n), _XML_WS)}" + (f" _note={quoteattr(note, _XML_WS)}" if note else "")
+        self.buf.append(f"{'  ' * (depth + 2)}<outline {attrs}{'/' if not s.child_count[n] else ''}>\n")
+    def close(self, n, depth):
+        if self.store.child_count[n]: self.buf.append(f"{'  ' * (depth + 2)}</outline>\n")
+    def finish(self): self.buf.append("  </body>\n</opml>\n"); self.flush()
+
+
+class _CsvWriter(_TextWriter):
+    nested = False
+    def __init__(self, store, f):
+        super().__init__(store, f); self.out = io.StringIO(); self.w = csv.writer(self.out); self.w.writerow(HEADER)
+    def open(self, n, depth, path): self.w.writerow([path, self.store.code(n), self.store.remark(n)])
+    def flush(self): self.f.write(self.out.getvalue()); self.out.seek(0); self.out.truncate()
+
+
+class _XlsxWriter:
+    """openpyxl 只写模式：行直接流进临时文件，保存时再打包"""
+    mode = "binary"; nested = False
+    def __init__(self, store, f):
+        from openpyxl import Workbook
+        self.store = store; self.f = f; self.wb = Workbook(write_only=True); self.ws = self.wb.create_sheet("Catalog")
+        self.ws.append(HEADER)
+    def open(self, n, depth, path): self.ws.append([path, self.store.code(n), self.store.remark(n)])
+    def close(self, n, depth): pass
+    def flush(self): pass
+    def finish(self): self.wb.save(self.f)
+
+
+WRITERS = {"txt": _TextWriter, "csv": _CsvWriter, "xlsx": _XlsxWriter, "opml": _OpmlWriter}
+
+
+def filter_for(store, coded_only=False, favorites_only=False):
+    """walk 用的 keep：coded_only 只要有编码的叶子，favorites_only 只要收藏的节点 (两者可叠加)，都不要时为 None"""
+    if not (coded_only or favorites_only): return None
+    code_id, is_folder, fav = store.code_id, store.is_folder, store.fav
+    def keep(n): return (not coded_only or (code_id[n] and not is_folder[n])) and (not favorites_only or fav[n])
+    return keep
+
+
+def write_catalog(store, f, fmt="txt", top=ROOT, keep=None, on_batch=None, batch=EXPORT_BATCH):
+    """把 top 的子孙 (不含 top) 按 fmt 写进已打开的 f (xlsx 要二进制文件)，返回写出的节点数。
+    每遍历 batch 个节点把缓冲写出一次并调用 on_batch(已遍历数)，on_batch 可抛异常中止"""
+    w = WRITERS[fmt](store, f); written = 0; flat_keep = None if w.nested else keep
+    def counted():
+        for i, n in enumerate(store.iter_subtree(top, False), 1):
+            if i % batch == 0:
+                w.flush()
+                if on_batch: on_batch(i)
+            yield n
+    for is_open, n, depth, p in walk(store, top, keep, counted()):
+        if not is_open: w.close(n, depth)
+        elif flat_keep is None or flat_keep(n): w.open(n, depth, p); written += 1
+    w.finish()
+    return written
+
+
+def export_catalog(store, path, fmt=None, top=ROOT, coded_only=False, favorites_only=False, progress=None, is_cancelled=None, batch=EXPORT_BATCH):
+    """写到 path (格式默认按扩展名)，返回写出的节点数；过滤见 filter_for。
+    progress(已遍历, 总数)；is_cancelled() 为真时抛出 ExportCancelled。
+    遍历期间不能改动 store，界面上应传入 store.snapshot()"""
+    fmt = fmt or format_of(path); keep = filter_for(store, coded_only, favorites_only)
+    total = len(store) if top == ROOT else sum(1 for _ in store.iter_subtree(top, False))
+    def on_batch(done):
+        if is_cancelled and is_cancelled(): raise ExportCancelled()
+        if progress: progress(done, total)
+    out = {}
+    def write(f): out["n"] = write_catalog(store, f, fmt, top, keep, on_batch, batch)
+    with prof.span(f"export.{fmt}"):
+        if WRITERS[fmt].mode == "binary": atomic_write(path, write)
+        else: atomic_write(path, write, 'w', encoding='utf-8-sig' if fmt == "csv" else 'utf-8', newline='')
+        prof.count("nodes_visited", total); prof.count("bytes_written", os.path.getsize(path))
+    if progress: progress(total, total)
+    return out["n"]
@@ -0,0 +1,108 @@
+"""路径 / 编码反查索引 (无 GUI 依赖)：规范化全路径 -> 节点，编码 -> 节点，编码前缀 -> 节点
+
+挂在 store.listeners 上，改名 (连同整棵子树的路径)、新增、删除、改编码时增量更新。
+每个节点的规范化路径由父节点路径拼上规范化名称得到 (normalize 逐字符处理，与对整条路径规范化结果相同)，
+同名字符串只规范化一次。
+"""
+from category_core import ROOT, normalize
+from category_profile import PROFILER as prof
+
+
+def code_prefix(code): return code.split('/')[0]
+
+
+class _MultiMap:
+    """键 -> 节点；同一键出现多个节点时才转存为集合 (绝大多数键唯一，省内存)，dups 即重复项"""
+    __slots__ = ("one", "dups")
+    def __init__(self): self.one = {}; self.dups = {}
+
+    def add(self, k, n):
+        d = self.dups.get(k)
+        if d is not None: d.add(n)
+        elif k in self.one: self.dups[k] = {self.one.pop(k), n}
+        else: self.one[k] = n
+
+    def discard(self, k, n):
+        d = self.dups.get(k)
+        if d is not None:
+            d.discard(n)
+            if len(d) == 1: self.one[k] = d.pop(); del self.dups[k]
+        elif self.one.get(k) == n: del self.one[k]
+
+    def get(self, k):
+        n = self.one.get(k)
+        if n is not None: return (n,)
+        return tuple(sorted(self.dups.get(k, ())))
+
+
+class PathIndex:
+    """节点路径与编码的反查表：精确匹配 CSV 路径、按编码查找、查重、按前缀重新着色都用它"""
+    def __init__(self, store):
+        self.store = store
+        self._npath = {}            # 节点 -> 规范化全路径
+        self._norm = {}             # name_id -> 规范化名称
+        self._paths = _MultiMap()   # 规范化全路径 -> 节点
+        self._codes = _MultiMap()   # 编码 -> 节点
+        self._prefix = {}           # 编码前缀 -> {节点}，按首次出现的顺序
+        with prof.span("index.build"):
+            for n in store.nodes(): self._add(n)
+            prof.count("nodes_visited", len(self._npath))
+        store.listeners.append(self.on_store_change)
+
+    def close(self):
+        if self.on_store_change in self.store.listeners: self.store.listeners.remove(self.on_store_change)
+
+    def _norm_name(self, nid):
+        v = self._norm.get(nid)
+        if v is None: v = self._norm[nid] = normalize(self.store.strings[nid])
+        return v
+
+    def _set_path(self, n):
+        p = self.store.parent[n]; name = self._norm_name(self.store.name_id[n])
+        path = self._npath[n] = self._npath[p] + "/" + name if p != ROOT else name
+        self._paths.add(path, n)
+
+    def _add_code(self, n, cid):
+        if not cid: return
+        code = self.store.strings[cid]; self._codes.add(code, n)
+        self._prefix.setdefault(code_prefix(code), set()).add(n)
+
+    def _drop_code(self, n, cid):
+        if not cid: return
+        code = self.store.strings[cid]; self._codes.discard(code, n); p = code_prefix(code)
+        nodes = self._prefix.get(p)
+        if nodes is not None:
+            nodes.discard(n)
+            if not nodes: del self._prefix[p]
+
+    def _add(self, n): self._set_path(n); self._add_code(n, self.store.code_id[n])
+
+    def on_store_change(self, event, n, old):
+        s = self.store
+        if event == "add": self._add(n)
+        elif event == "remove":
+            for r in old: self._paths.discard(self._npath.pop(r), r); self._drop_code(r, s.code_id[r])
+        elif event == "name":
+            for x in s.iter_subtree(n): self._paths.discard(self._npath[x], x); self._set_path(x)
+        elif event == "code": self._drop_code(n, old); self._add_code(n, s.code_id[n])
+
+    # ---------- 查询 ----------
+    def path_of(self, n): return self._npath[n]
+
+    def find_path(self, path):
+        """按路径 (规范化后比较) 找节点，返回按 id 排序的元组"""
+        return self._paths.get("/".join(p for p in normalize(path).split("/") if p))
+
+    def find_code(self, code): return self._codes.get(code.strip())
+
+    def find_prefix(self, prefix): return self._prefix.get(prefix.strip(), set())
+
+    def prefixes(self): return self._prefix.keys()
+
+    def duplicate_codes(self):
+        """{编码: [节点...]}，只含被多个节点共用的编码"""
+        return {k: sorted(v) for k, v in self._codes.dups.items()}
+
+    def duplicate_paths(self):
+        """{规范化路径: [节点...]}，只含同一路径 (规范化后) 下有多个节点的"""
+        return {k: sorted(v) for k, v in self._paths.dups.items()}
@@ -0,0 +1,79 @@
+"""CSV / XLSX 规则读取 (无 GUI 依赖)：只读两列、直接跳到行窗口、分块流式处理
+
+规则格式与 load_csv_and_update 原来生成的一致：{规范化路径: {"code", "leaf", "raw_path"}}
+"""
+import os
+
+import pandas as pd
+
+PATH_COL = "类目途径"
+CODE_COL = "分类"
+CHUNK_ROWS = 50000
+
+
+def _wanted(col): return str(col).strip() in (PATH_COL, CODE_COL)
+
+
+def _cell(v):
+    """Excel 单元格转字符串：None -> ""，整数值的浮点去掉 .0"""
+    if v is None: return ""
+    if isinstance(v, float) and v.is_integer(): return str(int(v))
+    return str(v)
+
+
+def add_rules(rules, paths, codes):
+    """向量化规范化一批路径/编码 (pandas Series) 并并入 rules；同一路径后出现的覆盖前面的"""
+    p = paths.fillna("").astype(str).str.strip(); c = codes.fillna("").astype(str).str.strip()
+    keep = (p != "") & (c != "") & (c != "nan")
+    p, c = p[keep], c[keep]
+    slashed = p.str.replace("\\", "/", regex=False)
+    norm = p.str.lower().str.replace(" ", "", regex=False).str.replace(">", "/", regex=False).str.replace("\\", "/", regex=False)
+    leaf = slashed.str.rsplit("/", n=1).str[-1]
+    for k, code, lf, raw in zip(norm.tolist(), c.tolist(), leaf.tolist(), p.tolist()):
+        rules[k] = {"code": code, "leaf": lf, "raw_path": raw}
+    return len(p)
+
+
+def _frame_columns(df):
+    df.columns = [str(c).strip() for c in df.columns]
+    missing = [c for c in (PATH_COL, CODE_COL) if c not in df.columns]
+    if missing: raise ValueError(f"缺少列: {', '.join(missing)}")
+    return df[PATH_COL], df[CODE_COL]
+
+
+def iter_csv_chunks(path, start_idx, end_idx, chunksize=CHUNK_ROWS):
+    """按块读 CSV 的 [start_idx, end_idx] 数据行 (0 起、含两端，与 df.loc 切片相同；end_idx 为 None 读到末尾)，只解析两列"""
+    nrows = None if end_idx is None else end_idx - start_idx + 1
+    if nrows is not None and nrows <= 0: return
+    reader = pd.read_csv(path, usecols=_wanted, dtype=str, keep_default_na=False, skiprows=range(1, start_idx + 1),
+                         nrows=nrows, chunksize=chunksize, encoding_errors="replace")
+    with reader:
+        for chunk in reader: yield _frame_columns(chunk)
+
+
+def iter_xlsx_chunks(path, start_idx, end_idx, chunksize=CHUNK_ROWS):
+    """openpyxl 只读流式模式读取第一个工作表的行窗口"""
+    from openpyxl import load_workbook
+    if end_idx is not None and end_idx < start_idx: return
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        header = [str(h).strip() if h is not None else "" for h in next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ())]
+        missing = [c for c in (PATH_COL, CODE_COL) if c not in header]
+        if missing: raise ValueError(f"缺少列: {', '.join(missing)}")
+        pi, ci = header.index(PATH_COL), header.index(CODE_COL); paths, codes = [], []
+        for row in ws.iter_rows(min_row=start_idx + 2, max_row=None if end_idx is None else end_idx + 2, values_only=True):
+            paths.append(_cell(row[pi]) if pi < len(row) else ""); codes.append(_cell(row[ci]) if ci < len(row) else "")
+            if len(paths) >= chunksize: yield pd.Series(paths), pd.Series(codes); paths, codes = [], []
+        if paths: yield pd.Series(paths), pd.Series(codes)
+    finally: wb.close()
+
+
+def read_rules(paths, start_idx=0, end_idx=None, rules=None):
+    """把一个或多个 CSV/XLSX 文件的行窗口合并成一份规则 (后面的文件覆盖前面的同路径规则)"""
+    if isinstance(paths, (str, os.PathLike)): paths = [paths]
+    rules = {} if rules is None else rules
+    for path in paths:
+        reader = iter_xlsx_chunks if str(path).lower().endswith((".xlsx", ".xlsm")) else iter_csv_chunks
+        for p, c in reader(path, start_idx, end_idx): add_rules(rules, p, c)
+    return rules
@@ -0,0 +1,134 @@
+"""CSV 规则的 OCR 模糊匹配引擎 (无 GUI 依赖)：分块剪枝 + 批量打分，可选多进程
+
+结果与逐条 difflib.get_close_matches(norm, keys, n=1, cutoff) 完全一致：
+长度带与字符计数上界 (即 quick_ratio) 都是 ratio 的严格上界，只会剪掉不可能胜出的规则；
+同父路径 / 共享末级三元组的规则先打分，尽早抬高当前最优分，后面按上界从高到低扫描并提前停止。
+"""
+import os
+import difflib
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from math import ceil, floor
+
+import numpy as np
+
+OCR_CUTOFF = 0.75
+PARALLEL_MIN_ITEMS = 2000   # 少于此数量的叶子不值得开进程池
+
+
+def _leaf_of(norm): return norm.rsplit("/", 1)[-1]
+def _parent_of(norm): return norm.rsplit("/", 1)[0] if "/" in norm else ""
+
+
+def _grams(s): return {s[i:i + 3] for i in range(len(s) - 2)} if len(s) >= 3 else ({s} if s else set())
+
+
+def classify(raw, cand):
+    """与原 check_ocr 相同的判定：返回 "⚠️ 尾部截断" / "🔡 OCR 错字" 或 None"""
+    t_leaf, c_leaf = raw, cand['leaf']
+    if len(t_leaf) > len(c_leaf) + 2: return None
+    if c_leaf.lower().startswith(t_leaf.lower()): return "⚠️ 尾部截断"
+    if difflib.SequenceMatcher(None, t_leaf.lower(), c_leaf[:len(t_leaf)].lower()).ratio() > 0.75: return "🔡 OCR 错字"
+    return None
+
+
+class OcrMatcher:
+    """rules: {规范化路径: {"code", "leaf", "raw_path"}}，即 load_csv_and_update 生成的 csv_rules"""
+    def __init__(self, rules, cutoff=OCR_CUTOFF):
+        self.rules = rules; self.cutoff = cutoff
+        self.keys = keys = sorted(rules, key=len)
+        self.lengths = np.fromiter((len(k) for k in keys), dtype=np.int32, count=len(keys))
+        self.alphabet = alphabet = {}
+        for k in keys:
+            for ch in k: alphabet.setdefault(ch, len(alphabet))
+        # 字符计数矩阵 (规则 × 字符)，一次性用 np.add.at 填充
+        self.counts = np.zeros((len(keys), max(1, len(alphabet))), dtype=np.int32)
+        if keys:
+            rows = np.repeat(np.arange(len(keys)), self.lengths)
+            cols = np.fromiter((alphabet[ch] for k in keys for ch in k), dtype=np.int64, count=int(self.lengths.sum()))
+            np.add.at(self.counts, (rows, cols), 1)
+        self.by_parent = {}; self.by_gram = {}
+        for i, k in enumerate(keys):
+            self.by_parent.setdefault(_parent_of(k), []).append(i)
+            for g in _grams(_leaf_of(k)): self.by_gram.setdefault(g, []).append(i)
+        self.stats = {"leaves": 0, "pruned": 0, "scored": 0, "classified": 0}
+
+    def _seeds(self, norm):
+        """分块：同父路径的规则 + 与末级名称共享三元组的规则 (取命中最多的前几十条)"""
+        seeds = set(self.by_parent.get(_parent_of(norm), ()))
+        hits = {}
+        for g in _grams(_leaf_of(norm)):
+            for i in self.by_gram.get(g, ()): hits[i] = hits.get(i, 0) + 1
+        if hits: seeds.update(sorted(hits, key=hits.get, reverse=True)[:32])
+        return seeds
+
+    def best_key(self, norm):
+        """等价于 difflib.get_close_matches(norm, keys, n=1, cutoff)[0]，没有则 None"""
+        n = len(self.keys); self.stats["leaves"] += 1
+        if not n: return None
+        la = len(norm); c = self.cutoff
+        # 1) 长度带：ratio <= 2*min(la, lb)/(la+lb)，放宽 1 个字符防浮点误差
+        lo = bisect_left(self.lengths, ceil(la * c / (2 - c)) - 1); hi = bisect_right(self.lengths, floor(la * (2 - c) / c) + 1)
+        if lo >= hi: self.stats["pruned"] += n; return None
+        # 2) 批量计算字符计数上界 (= quick_ratio)
+        q = np.zeros(self.counts.shape[1], dtype=np.int32)
+        for ch in norm:
+            j = self.alphabet.get(ch)
+            if j is not None: q[j] += 1
+        bounds = 2.0 * np.minimum(self.counts[lo:hi], q).sum(axis=1) / (la + self.lengths[lo:hi])
+        ok = np.nonzero(bounds >= c)[0]
+        if not len(ok): self.stats["pruned"] += n; return None
+        # 3) 先给分块内的候选打分，再按上界从高到低扫描，上界低于当前最优即停
+        sm = difflib.SequenceMatcher(); sm.set_seq2(norm); keys = self.keys
+        best = (-1.0, ""); scored = 0; done = set()
+        for i in self._seeds(norm):
+            if lo <= i < hi and bounds[i - lo] >= c:
+                sm.set_seq1(keys[i]); r = sm.ratio(); scored += 1; done.add(i)
+                if r >= c and (r, keys[i]) > best: best = (r, keys[i])
+        for j in ok[np.argsort(-bounds[ok], kind="stable")]:
+            if bounds[j] < best[0]: break
+            i = int(j) + lo
+            if i in done: continue
+            sm.set_seq1(keys[i]); r = sm.ratio(); scored += 1
+            if r >= c and (r, keys[i]) > best: best = (r, keys[i])
+        self.stats["scored"] += scored; self.stats["pruned"] += n - scored
+        return best[1] if best[0] >= 0 else None
+
+    def check(self, raw, norm):
+        """单个叶子：返回 (候选规则, 错误类型) 或 None"""
+        k = self.best_key(norm)
+        if k is None: return None
+        cand = self.rules[k]; typ = classify(raw, cand); self.stats["classified"] += 1
+        return (cand, typ) if typ else None
+
+    def check_many(self, items, processes=1):
+        """items: [(tag, raw, norm)]，按原顺序返回 [(tag, 候选规则, 错误类型)]；processes > 1 时分块交给进程池"""
+        items = list(items)
+        if processes <= 1 or len(items) < PARALLEL_MIN_ITEMS:
+            out = []
+            for tag, raw, norm in items:
+                r = self.check(raw, norm)
+                if r: out.append((tag, r[0], r[1]))
+            return out
+        size = ceil(len(items) / (processes * 4)); chunks = [items[i:i + size] for i in range(0, len(items), size)]
+        out = []
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(self.rules, self.cutoff)) as pool:
+            for res, stats in pool.map(_check_chunk, chunks):
+                out.extend(res)
+                for k, v in stats.items(): self.stats[k] += v
+        return out
+
+
+def default_processes(): return max(1, (os.cpu_count() or 1) - 1)
+
+
+_worker_matcher = None
+
+def _init_worker(rules, cutoff):
+    global _worker_matcher
+    _worker_matcher = OcrMatcher(rules, cutoff)
+
+def _check_chunk(chunk):
+    m = _worker_matcher; before = dict(m.stats)
+    res = m.check_many(chunk)
+    return res, {k: m.stats[k] - before[k] for k in m.stats}
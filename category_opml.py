@@ -0,0 +1,54 @@
+"""OPML 流式读取 (无 GUI 依赖)：iterparse 边读边建树，内存占用与文件大小无关"""
+import os
+import xml.etree.ElementTree as ET
+
+from category_core import CategoryStore, ROOT
+from category_profile import PROFILER as prof
+
+OPML_BATCH = 2000   # 每建这么多节点回报一次进度/检查一次取消
+
+
+class OpmlCancelled(Exception):
+    pass
+
+
+class _CountingReader:
+    """包一层文件对象，记录已读字节数用于进度"""
+    def __init__(self, f): self.f = f; self.bytes_read = 0
+    def read(self, size=-1):
+        data = self.f.read(size); self.bytes_read += len(data); return data
+
+
+def load_opml(path, store=None, parent=ROOT, progress=None, is_cancelled=None, batch=OPML_BATCH):
+    """把 OPML <body> 下的 outline 逐个挂到 store 的 parent 节点下，返回 store。
+    只取 text/title 属性 (其余如 _mubu_text/_mubu_note 随元素一起丢弃)，无文字的节点连同子树跳过；
+    progress(已读字节, 总字节, 已建节点)；is_cancelled() 为真时抛出 OpmlCancelled。"""
+    store = CategoryStore() if store is None else store
+    total = os.path.getsize(path); built = 0
+    with prof.span("opml.load"), open(path, 'rb') as f:
+        reader = _CountingReader(f)
+        elems = []        # 打开中的 XML 元素 (用于及时释放已处理的子元素)
+        nodes = []        # 与 elems 对齐：对应的节点 id，None 表示被跳过的子树
+        in_body = False
+        for event, elem in ET.iterparse(reader, events=("start", "end")):
+            if event == "start":
+                if elem.tag == "body" and not in_body: in_body = True; elems.append(elem); nodes.append(parent); continue
+                if not in_body: continue
+                p = nodes[-1] if nodes else None
+                t = (elem.get('text') or elem.get('title')) if elem.tag == "outline" and p is not None else None
+                nodes.append(store.add_node(p, t) if t else None); elems.append(elem)
+                if t:
+                    built += 1
+                    if built % batch == 0:
+                        if is_cancelled and is_cancelled(): raise OpmlCancelled()
+                        if progress: progress(reader.bytes_read, total, built)
+                continue
+            if not in_body or not elems or elems[-1] is not elem: continue
+            elems.pop(); n = nodes.pop()
+            if elem.tag == "body": in_body = False; elem.clear(); continue
+            if n is not None: store.is_folder[n] = 1 if store.child_count[n] > 0 else 0
+            elem.clear()
+            if elems: del elems[-1][-1]   # 当前元素一定是父元素最后一个子元素
+    if progress: progress(total, total, built)
+    prof.count("nodes_visited", built)
+    return store
@@ -0,0 +1,69 @@
+"""批处理操作 (无 GUI 依赖)：界面与命令行共用。
+pandas / numpy / openpyxl 只在真正读表格、做模糊匹配时才导入，命令行做转换/导出/搜索时启动很快。
+"""
+import difflib
+
+from category_core import ROOT, normalize
+from category_index import PathIndex
+from category_profile import PROFILER as prof
+
+
+def read_rules(paths, start_idx=0, end_idx=None):
+    """见 category_ingest.read_rules (延迟导入 pandas)"""
+    from category_ingest import read_rules as _read
+    with prof.span("read_rules"): return _read(paths, start_idx, end_idx)
+
+
+def scan_matches(store, rules, top=ROOT, processes=1, fuzzy=True, index=None):
+    """叶子先查精确路径，剩下的整批交给 OCR 匹配引擎 (processes > 1 时多进程)。
+    返回 (精确列表, 模糊列表, 引擎)；模糊项带 score (规范化后叶子名的相似度，整条路径比会让同级兄弟都接近 1)
+    和 same_parent (父路径规范化后完全相同)；fuzzy=False 时只做精确匹配。
+    index 为现成的 PathIndex (界面常驻一个)，不给时临时建一个"""
+    own = index is None
+    if own: index = PathIndex(store)
+    exact, todo = [], []; visited = 0
+    try:
+        with prof.span("match.exact"):
+            path_of = index.path_of
+            for n in store.iter_subtree(top, False):
+                visited += 1
+                if store.is_folder[n] or not store.name_id[n]: continue
+                norm = path_of(n); rule = rules.get(norm)
+                if rule is not None: exact.append({"node": n, "code": rule['code'], "tree_name": store.name(n), "type": "exact"})
+                else: todo.append((n, store.name(n), norm))
+            prof.count("nodes_visited", visited)
+    finally:
+        if own: index.close()
+    if not fuzzy: return exact, [], None
+    from category_match import OcrMatcher
+    with prof.span("match.fuzzy"):
+        engine = OcrMatcher(rules); fuzzy = []; norms = {n: norm for n, _, norm in todo}
+        for n, cand, typ in engine.check_many(todo, processes):
+            t_parent, _, t_leaf = norms[n].rpartition("/"); c_parent, _, c_leaf = normalize(cand['raw_path']).rpartition("/")
+            fuzzy.append({"node": n, "code": cand['code'], "tree_name": store.name(n), "full_path": store.full_path(n),
+                          "csv_path": cand['raw_path'], "match_type": typ, "score": difflib.SequenceMatcher(None, t_leaf, c_leaf).ratio(),
+                          "same_parent": t_parent == c_parent})
+        st = engine.stats; prof.count("candidates_scored", st["scored"]); prof.count("difflib_calls", st["scored"] + st["classified"] + len(fuzzy))
+    return exact, fuzzy, engine
+
+
+def apply_codes(store, matches, on_change=None):
+    """把匹配结果的编码写进树 (已删除的节点跳过)，返回实际改动的节点数；on_change(node, code) 供界面刷新颜色"""
+    cnt = 0
+    with prof.span("apply_codes"):
+        for m in matches:
+            node, code = m['node'], m['code']
+            if store.alive[node] and store.code(node) != code:   # 匹配之后节点可能已被删除 (如合并了远端修改)
+                store.set_code(node, code); cnt += 1
+                if on_change: on_change(node, code)
+    return cnt
+
+
+def find_path(store, path, index=None):
+    """按 “a/b/c” 路径 (规范化后比较) 找节点，找不到返回 None；有 PathIndex 时直接查表"""
+    if index is not None: return next(iter(index.find_path(path)), None) if normalize(path).strip("/") else ROOT
+    n = ROOT
+    for part in (p for p in normalize(path).split("/") if p):
+        n = next((c for c in store.children(n) if normalize(store.name(c)) == part), None)
+        if n is None: return None
+    return n
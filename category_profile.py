@@ -0,0 +1,104 @@
+"""操作耗时剖析 (无 GUI 依赖)：命名区段 + 计数器，滚动历史，导出 Chrome trace (chrome://tracing / Perfetto 可打开)
+
+    from category_profile import PROFILER as prof
+    with prof.span("csv.scan"): ...
+    prof.count("nodes_visited", n)        # 热循环里先本地累加，循环结束再记一次
+
+关闭时 span() 返回共享的空上下文、count() 立即返回，几乎零开销。环境变量 HD_PROFILE=1 启动即开启。
+最外层区段 (同一线程上没有父区段) 视为一次操作，结束时连同各阶段耗时、计数器记入 history。
+"""
+import os
+import json
+import functools
+import time
+import threading
+from collections import deque
+
+HISTORY = 50           # 保留最近多少次操作
+MAX_EVENTS = 200000    # trace 事件上限，超出后丢最早的
+COUNTER_LABELS = {"nodes_visited": "遍历节点", "difflib_calls": "difflib 调用", "candidates_scored": "候选打分",
+                  "items_recolored": "重新着色", "bytes_written": "写入字节"}
+
+
+class _NullSpan:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("prof", "name", "start", "counters", "phases")
+    def __init__(self, prof, name): self.prof = prof; self.name = name; self.counters = {}; self.phases = {}
+
+    def __enter__(self):
+        self.prof._stack().append(self); self.start = time.perf_counter(); return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter(); st = self.prof._stack(); st.pop()
+        self.prof._finish(self, end - self.start, st[-1] if st else None)
+        return False
+
+
+class Profiler:
+    def __init__(self, enabled=False):
+        self.enabled = enabled; self.events = deque(maxlen=MAX_EVENTS); self.history = deque(maxlen=HISTORY)
+        self.totals = {}; self.lock = threading.Lock(); self._local = threading.local(); self._t0 = time.perf_counter()
+
+    def _stack(self):
+        st = getattr(self._local, "stack", None)
+        if st is None: st = self._local.stack = []
+        return st
+
+    def span(self, name): return _Span(self, name) if self.enabled else _NULL_SPAN
+
+    def profiled(self, name):
+        """装饰器：整个函数调用记为一个区段"""
+        def deco(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kw):
+                if not self.enabled: return fn(*args, **kw)
+                with _Span(self, name): return fn(*args, **kw)
+            return wrapper
+        return deco
+
+    def count(self, name, k=1):
+        """计数记到当前线程所有未结束的区段上 (即各层都是含子区段的累计值) 以及会话总计"""
+        if not self.enabled or not k: return
+        for s in self._stack(): s.counters[name] = s.counters.get(name, 0) + k
+        with self.lock: self.totals[name] = self.totals.get(name, 0) + k
+
+    def _finish(self, span, dur, parent):
+        ev = {"name": span.name, "ph": "X", "ts": round((span.start - self._t0) * 1e6, 1), "dur": round(dur * 1e6, 1),
+              "pid": os.getpid(), "tid": threading.get_ident()}
+        if span.counters: ev["args"] = dict(span.counters)
+        with self.lock:
+            self.events.append(ev)
+            if parent is not None: parent.phases[span.name] = parent.phases.get(span.name, 0.0) + dur
+            else: self.history.append({"name": span.name, "time": dur, "phases": dict(span.phases), "counters": dict(span.counters), "at": time.time()})
+
+    def last(self):
+        with self.lock: return self.history[-1] if self.history else None
+
+    def reset(self):
+        with self.lock: self.events.clear(); self.history.clear(); self.totals = {}
+
+    def export_chrome_trace(self, path):
+        """写 Chrome trace JSON；历史与计数器总计放在 otherData 里"""
+        with self.lock: data = {"traceEvents": list(self.events), "displayTimeUnit": "ms",
+                                "otherData": {"history": list(self.history), "totals": dict(self.totals)}}
+        with open(path, 'w', encoding='utf-8') as f: json.dump(data, f, ensure_ascii=False)
+        return len(data["traceEvents"])
+
+
+def summary(rec):
+    """一次操作的单行摘要：总耗时 (各阶段耗时) 计数器"""
+    if not rec: return ""
+    prefix = rec["name"] + "."
+    phases = " / ".join(f"{k[len(prefix):] if k.startswith(prefix) else k} {v:.2f}s" for k, v in rec["phases"].items())
+    counters = "，".join(f"{COUNTER_LABELS.get(k, k)} {v}" for k, v in rec["counters"].items())
+    return f"⏱ {rec['name']} {rec['time']:.2f}s" + (f" ({phases})" if phases else "") + (f"  {counters}" if counters else "")
+
+
+PROFILER = Profiler(enabled=os.environ.get("HD_PROFILE", "") not in ("", "0"))
@@ -0,0 +1,310 @@
+"""项目文件读写 (无 GUI 依赖)：紧凑二进制列式格式 + 兼容旧版 JSON，保存一律原子替换；
+另有追加式修改日志 (<项目文件>.<用户>.journal)，两次全量保存之间的修改只追加增量
+
+二进制布局 (小端)：
+    MAGIC(8) | 头 <IIII: 节点数 n, 字符串数 m, 字符串区字节数, 保留
+    字符串区: m+1 个 uint32 字符偏移 + 所有字符串拼接后的 UTF-8
+    列: parent / name_id / code_id / remark_id 各 n 个 int32，fav / is_folder / expanded 各 n 字节
+节点按先序编号 1..n (0 为根)，子节点顺序即出现顺序。
+"""
+import os
+import re
+import sys
+import json
+import hashlib
+import getpass
+import struct
+import tempfile
+from array import array
+
+from category_core import CategoryStore, ROOT, NO_NODE
+from category_profile import PROFILER as prof
+
+PROJECT_MAGIC = b"HDCAT\x00v1"
+PROJECT_EXT = ".hdproj"
+_HEADER = struct.Struct("<IIII")
+_UMASK = os.umask(0); os.umask(_UMASK)   # 导入时 (还没有后台线程) 读一次；umask 只能先改再改回来
+
+
+def atomic_write(path, write_fn, mode='wb', **open_kw):
+    """先写同目录临时文件并 fsync，再 os.replace 覆盖目标，中途崩溃不会留下半个文件。
+    mkstemp 建的文件是 0600，替换前改成原文件的权限 (新文件按 umask 取 0666 去掉的位)，共享目录里的项目不会变成只有自己能读"""
+    path = os.path.abspath(path); d = os.path.dirname(path)
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=d)
+    try:
+        with os.fdopen(fd, mode, **open_kw) as f:
+            write_fn(f); f.flush(); os.fsync(f.fileno())
+        try: perm = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError: perm = 0o666 & ~_UMASK
+        os.chmod(tmp, perm); os.replace(tmp, path)
+    except BaseException:
+        try: os.remove(tmp)
+        except OSError: pass
+        raise
+
+
+def _le(a):
+    if sys.byteorder == "big": a = array(a.typecode, a); a.byteswap()
+    return a
+
+
+def write_binary(store, f):
+    strings, parent, name_id, code_id, remark_id, fav, is_folder, expanded = store.to_columns()
+    offsets = array('I', [0]); pos = 0
+    for t in strings: pos += len(t); offsets.append(pos)
+    blob = "".join(strings).encode("utf-8")
+    f.write(PROJECT_MAGIC); f.write(_HEADER.pack(len(parent), len(strings), len(blob), 0))
+    f.write(_le(offsets).tobytes()); f.write(blob)
+    for col in (parent, name_id, code_id, remark_id): f.write(_le(col).tobytes())
+    for col in (fav, is_folder, expanded): f.write(col)
+    return len(parent)
+
+
+def read_binary(data):
+    """从整块字节 (bytes / mmap) 直接建树，不经过中间字典"""
+    mv = memoryview(data)
+    if bytes(mv[:len(PROJECT_MAGIC)]) != PROJECT_MAGIC: raise ValueError("不是二进制项目文件")
+    if len(mv) < len(PROJECT_MAGIC) + _HEADER.size: raise ValueError("项目文件被截断")
+    pos = len(PROJECT_MAGIC); n, m, blob_len, _ = _HEADER.unpack_from(mv, pos); pos += _HEADER.size
+    def take(typecode, count):
+        nonlocal pos
+        a = array(typecode); size = a.itemsize * count
+        if pos + size > len(mv): raise ValueError("项目文件被截断")
+        a.frombytes(mv[pos:pos + size]); pos += size
+        if sys.byteorder == "big": a.byteswap()
+        return a
+    offsets = take('I', m + 1)
+    if pos + blob_len > len(mv): raise ValueError("项目文件被截断")
+    text = str(mv[pos:pos + blob_len], "utf-8"); pos += blob_len
+    strings = [text[offsets[i]:offsets[i + 1]] for i in range(m)]
+    parent, name_id, code_id, remark_id = (take('i', n) for _ in range(4))
+    if pos + 3 * n > len(mv): raise ValueError("项目文件被截断")
+    fav, is_folder, expanded = (bytearray(mv[pos + k * n:pos + (k + 1) * n]) for k in range(3))
+    return CategoryStore.from_columns(strings, parent, name_id, code_id, remark_id, fav, is_folder, expanded)
+
+
+# ================= 旧版 JSON =================
+# 嵌套结构的深度就是树的深度，标准库的 json 编解码是递归的，几千层的链会 RecursionError，这里都用显式栈
+JSON_BATCH = 5000   # 每这么多节点把缓冲写出一次
+_WS = re.compile(r'[ \t\n\r]*')
+_SCALAR = re.compile(r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?|true|false|null')
+_CONST = {"true": True, "false": False, "null": None}
+
+
+def write_json(store, f):
+    """边先序遍历边写，输出与旧版把整棵树组成嵌套字典 (根节点 name/fav/is_folder 为 null) 后 json.dump(..., ensure_ascii=False, indent=2) 逐字节相同"""
+    enc = json.JSONEncoder(ensure_ascii=False).encode; first, nxt, par = store.first_child, store.next_sibling, store.parent
+    def head(n, k):
+        i = "\n" + "  " * (k + 1); b = lambda v: "true" if v else "false"
+        return (f"{{{i}\"name\": {enc(store.name(n))},{i}\"code\": {enc(store.code(n))},{i}\"remark\": {enc(store.remark(n))},"
+                f"{i}\"fav\": {b(store.fav[n])},{i}\"is_folder\": {b(store.is_folder[n])},{i}\"expanded\": {b(store.expanded[n])},{i}\"children\": ")
+    buf = ['{\n  "name": null,\n  "code": "",\n  "remark": "",\n  "fav": null,\n  "is_folder": null,\n  "expanded": false,\n  "children": ']
+    n, k, count = ROOT, 0, 0   # k：当前节点对象的缩进层数 (根 0，每深一层 +2)
+    while True:
+        c = first[n]
+        if c != NO_NODE: n = c; k += 2; buf.append(f"[\n{'  ' * k}{head(n, k)}")
+        else:
+            buf.append(f"[]\n{'  ' * k}}}")
+            while n != ROOT and nxt[n] == NO_NODE: n = par[n]; k -= 2; buf.append(f"\n{'  ' * (k + 1)}]\n{'  ' * k}}}")
+            if n == ROOT: break
+            n = nxt[n]; buf.append(f",\n{'  ' * k}{head(n, k)}")
+        count += 1
+        if count % JSON_BATCH == 0: f.write("".join(buf)); buf.clear()
+    f.write("".join(buf))
+    return count
+
+
+def _loads_deep(s):
+    """json.loads 的显式栈版本，标准库递归溢出时才用 (慢，但不受嵌套深度限制)"""
+    stack = []; pos = _WS.match(s, 0).end()   # stack: [容器, 当前键 (列表为 None)]
+    def fail(pos): return ValueError(f"JSON 格式错误 (位置 {pos})")
+    def key_at(pos):
+        if s[pos:pos + 1] != '"': raise fail(pos)
+        k, pos = json.decoder.scanstring(s, pos + 1); pos = _WS.match(s, pos).end()
+        if s[pos:pos + 1] != ":": raise fail(pos)
+        return k, _WS.match(s, pos + 1).end()
+    while True:
+        ch = s[pos:pos + 1]
+        if ch in ("{", "["):
+            cont = {} if ch == "{" else []; pos = _WS.match(s, pos + 1).end()
+            if s[pos:pos + 1] != ("}" if ch == "{" else "]"):
+                stack.append([cont, None])
+                if ch == "{": stack[-1][1], pos = key_at(pos)
+                continue
+            value = cont; pos += 1
+        elif ch == '"': value, pos = json.decoder.scanstring(s, pos + 1)
+        else:
+            m = _SCALAR.match(s, pos)
+            if not m or not ch: raise fail(pos)
+            t = m.group(); value = _CONST[t] if t in _CONST else json.loads(t); pos = m.end()
+        while True:   # 把值放进上层容器，再看后面是 “,” 还是收尾
+            pos = _WS.match(s, pos).end()
+            if not stack:
+                if pos != len(s): raise fail(pos)
+                return value
+            cont, k = stack[-1]
+            if k is None: cont.append(value)
+            else: cont[k] = value
+            ch = s[pos:pos + 1]; pos = _WS.match(s, pos + 1).end()
+            if ch == ",":
+                if k is not None: stack[-1][1], pos = key_at(pos)
+                break
+            if ch != ("]" if k is None else "}"): raise fail(pos)
+            stack.pop(); value = cont
+
+
+def parse_project(data):
+    """按文件头自动识别二进制 / JSON (旧版列表或根节点字典)"""
+    with prof.span("project.parse"):
+        if data.startswith(PROJECT_MAGIC): return read_binary(data)
+        text = data.decode('utf-8-sig')
+        try: obj = json.loads(text)
+        except RecursionError: obj = _loads_deep(text)
+        return CategoryStore.from_data(obj)
+
+
+def load_project_file(path):
+    with open(path, 'rb') as f: return parse_project(f.read())
+
+
+class _Fingerprinter:
+    """包住输出文件，边写边累计字节数与 SHA-1，结果与 data_fingerprint(写出的内容) 相同，保存后不必再读回来"""
+    def __init__(self, f, encoding=None): self.f = f; self.encoding = encoding; self.h = hashlib.sha1(); self.size = 0
+    def write(self, data):
+        b = data.encode(self.encoding) if self.encoding else data
+        self.h.update(b); self.size += len(b); return self.f.write(data)
+    def fingerprint(self): return f"{self.size}:{self.h.hexdigest()}"
+
+
+def save_project_file(store, path, fmt=None):
+    """fmt 为 "binary" / "json"，缺省按扩展名：.json 仍写旧版 JSON，其余写二进制。返回写出文件的指纹"""
+    fmt = fmt or ("json" if path.lower().endswith(".json") else "binary")
+    out = {}
+    def write(f, encoding=None):
+        w = out["w"] = _Fingerprinter(f, encoding)
+        if fmt == "json": write_json(store, w)
+        else: write_binary(store, w)
+    with prof.span("project.write"):
+        if fmt == "json": atomic_write(path, lambda f: write(f, "utf-8"), 'w', encoding='utf-8', newline='')   # 不转换换行，指纹才与磁盘内容一致
+        else: atomic_write(path, write)
+        prof.count("bytes_written", out["w"].size)
+    return out["w"].fingerprint()
+
+
+# ================= 追加式修改日志 =================
+JOURNAL_SUFFIX = ".journal"
+
+
+class JournalMismatch(Exception):
+    """日志记录的快照与当前项目文件不一致 (例如同事已经覆盖保存)，不能按节点 id 回放"""
+
+
+def journal_path(project_path):
+    """日志与项目文件放在同一目录，按用户名区分 (项目文件常放在共享盘上多人同时用)"""
+    try: user = getpass.getuser()
+    except Exception: user = "user"
+    return f"{project_path}.{user}{JOURNAL_SUFFIX}"
+
+
+def data_fingerprint(data):
+    """快照文件指纹：大小 + 内容 SHA-1，日志用它确认回放基准"""
+    return f"{len(data)}:{hashlib.sha1(data).hexdigest()}"
+
+
+class ChangeJournal:
+    """挂在 store.listeners 上，把每次修改记成一行 JSON；flush() 只追加尚未写盘的增量并 fsync。
+    日志里的节点 id 用“快照重新加载后的编号”：快照加载后是先序 1..n，新节点依次往后编号，按顺序回放即可复原。
+    刚加载的 store 编号与之相同 (idmap 为 None)；全量保存后 store 内的 id 不变，改用 preorder_ids() 映射。"""
+    def __init__(self, path, base):
+        self.path = path; self.base = base; self.pending = []; self.count = 0; self.store = None
+        self.idmap = None; self.next_id = 0
+        head = None
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                try: head = json.loads(f.readline() or "null")
+                except ValueError: head = None
+                self.count = sum(1 for _ in f)
+        if not isinstance(head, dict) or head.get("fp") != base: self.reset(base)   # 没有日志或基准已过期：重新开始
+
+    def attach(self, store, ids=None):
+        """ids 为 store.preorder_ids() 的结果 (刚保存过)；None 表示 store 就是从快照加载的"""
+        self.detach(); self.store = store; store.listeners.append(self.on_store_change)
+        if ids is None: self.idmap = None; self.next_id = store.capacity()
+        else: self.idmap = ids[0]; self.next_id = ids[1] + 1
+
+    def _id(self, n): return n if self.idmap is None else self.idmap[n]
+
+    def detach(self):
+        if self.store is not None and self.on_store_change in self.store.listeners: self.store.listeners.remove(self.on_store_change)
+        self.store = None
+
+    def on_store_change(self, event, n, old):
+        s = self.store
+        if event == "add":
+            if self.idmap is not None:
+                if len(self.idmap) <= n: self.idmap.extend([0] * (n + 1 - len(self.idmap)))
+                self.idmap[n] = self.next_id
+            self.next_id += 1
+            e = {"op": "add", "n": self._id(n), "p": self._id(s.parent[n]), "name": s.name(n), "code": s.code(n), "remark": s.remark(n), "fav": s.fav[n], "folder": s.is_folder[n]}
+        elif event == "remove": e = {"op": "remove", "n": self._id(n)}
+        elif event in ("fav", "folder"): e = {"op": event, "n": self._id(n), "v": (s.fav if event == "fav" else s.is_folder)[n]}
+        else: e = {"op": event, "n": self._id(n), "v": (s.name, s.code, s.remark)[("name", "code", "remark").index(event)](n)}
+        self.pending.append(e)
+
+    def flush(self):
+        """把内存里的增量追加到日志文件，返回写入条数"""
+        if not self.pending: return 0
+        lines = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in self.pending)
+        with open(self.path, 'a', encoding='utf-8') as f: f.write(lines); f.flush(); os.fsync(f.fileno())
+        written = len(self.pending); self.count += written; self.pending = []
+        return written
+
+    def reset(self, base, ids=None):
+        """快照已全量保存：日志清空，只留新的基准头；ids 见 attach"""
+        self.base = base; self.pending = []; self.count = 0
+        if ids is not None and self.store is not None: self.attach(self.store, ids)
+        atomic_write(self.path, lambda f: f.write(json.dumps({"op": "base", "fp": base}) + "\n"), 'w', encoding='utf-8')
+
+    def rebase(self, base, store, ids, next_id, ops):
+        """项目文件被别人更新并已合并：以新快照为基准重写日志。ops/ids/next_id 见 category_sync.diff_ops"""
+        self.attach(store); self.base = base; self.pending = []; self.idmap = ids; self.next_id = next_id; self.count = len(ops)
+        lines = [json.dumps({"op": "base", "fp": base})] + [json.dumps(e, ensure_ascii=False) for e in ops]
+        atomic_write(self.path, lambda f: f.write("\n".join(lines) + "\n"), 'w', encoding='utf-8')
+
+    def discard(self):
+        self.detach(); self.pending = []
+        try: os.remove(self.path)
+        except OSError: pass
+
+
+def _apply_entry(store, e):
+    op, n = e["op"], e.get("n")
+    if op == "add":
+        got = store.add_node(e["p"], e["name"], e.get("code", ""), e.get("remark", ""), e.get("fav"), e.get("folder"))
+        if got != n: raise JournalMismatch(f"新节点编号不符: 期望 {n}，得到 {got}")
+        return
+    if not (0 < n < store.capacity() and store.alive[n]): raise JournalMismatch(f"节点 {n} 不存在")
+    if op == "remove": store.remove(n)
+    elif op == "name": store.set_name(n, e["v"])
+    elif op == "code": store.set_code(n, e["v"])
+    elif op == "remark": store.set_remark(n, e["v"])
+    elif op == "fav": store.set_fav(n, e["v"])
+    elif op == "folder": store.set_folder(n, e["v"])
+
+
+def replay_journal(store, path, base):
+    """把日志里尚未并入快照的修改回放到刚加载的 store 上，返回回放条数；
+    基准不符抛 JournalMismatch；末尾写了一半的行 (崩溃时) 忽略"""
+    if not os.path.exists(path): return 0
+    with open(path, 'r', encoding='utf-8', errors='replace') as f: lines = f.read().splitlines()
+    if len(lines) <= 1: return 0   # 只有基准头：没有待回放的修改
+    try: head = json.loads(lines[0])
+    except ValueError: raise JournalMismatch("日志头损坏")
+    if head.get("op") != "base" or head.get("fp") != base: raise JournalMismatch("项目文件已在别处更新，日志基准不一致")
+    applied = 0
+    with prof.span("journal.replay"):
+        for line in lines[1:]:
+            try: e = json.loads(line)
+            except ValueError: break
+            _apply_entry(store, e); applied += 1
+    return applied
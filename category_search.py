@@ -0,0 +1,223 @@
+"""搜索索引 (无 GUI 依赖)：名称三元组倒排索引，边输入边查，返回排好序的前 N 条"""
+import re
+import heapq
+import difflib
+import threading
+from array import array
+from math import ceil
+
+from category_core import ROOT, NO_NODE, normalize
+from category_profile import PROFILER as prof
+
+MIN_SCORE = 0.35   # 低于此分的候选不返回
+SHORT_UNION_MAX = 50000   # 1~2 字查询词：含它的三元组倒排表总长不超过此数时先求并集，否则按长度逐个名称判断
+DENSE_SHIFT = 6           # 倒排表长度达到 name_id 范围的 1/64 时，另存一份按 name_id 下标的字节数组 (此时不比集合占内存)
+MAX_GRAMS = 255           # Dice 计数每个名称一个字节，最多数这么多个三元组
+_SPLIT = re.compile(r"[/>\\]+")
+
+
+def grams(s):
+    """三元组集合；不足 3 个字符的名称整体作为一个键"""
+    if len(s) < 3: return {s} if s else set()
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+def highlight_spans(text, term):
+    """text 中与查询词对齐的 [start, end) 片段，用于结果高亮"""
+    t = term.lower().strip()
+    if not t: return []
+    low = text.lower(); i = low.find(t)
+    if i >= 0: return [(i, i + len(t))]
+    blocks = difflib.SequenceMatcher(None, low, t, autojunk=False).get_matching_blocks()
+    return [(b.a, b.a + b.size) for b in blocks if b.size >= 2]
+
+
+class SearchIndex:
+    """按去重后的名称建倒排表 (三元组 -> 名称 id -> 节点)；路径里的上级词在查询时沿祖先校验。
+    挂在 store.listeners 上，重命名/新增/删除时增量更新。"""
+    def __init__(self, store):
+        self.store = store; self.lock = threading.Lock()
+        self._grams = {}   # 三元组 -> {name_id}
+        self._nodes = {}   # name_id -> {node}
+        self._norm = {}    # name_id -> 规范化名称
+        self._heads = {}   # 规范化名称的前三个字 (不足三个字为整个名称) -> {name_id}
+        self._lens = {}    # 规范化名称长度 -> {name_id}
+        self._dense = {}   # 常见三元组 -> bytearray，下标 name_id 处为 1 表示含它；Dice 计数时才建，之后随增删维护
+        self._anc_grams = {}   # name_id -> 三元组，只缓存查路径时用到的祖先名称
+        self._nid = array('i', [NO_NODE]) * len(store.parent)   # 节点 -> 索引里登记的 name_id；搜索线程只读它，不读 store.name_id
+        for n in store.nodes(): self._add(n)
+        store.listeners.append(self.on_store_change)
+
+    def close(self):
+        if self.on_store_change in self.store.listeners: self.store.listeners.remove(self.on_store_change)
+
+    def _add(self, n):
+        nid = self.store.name_id[n]; nodes = self._nodes.get(nid)
+        if n >= len(self._nid): self._nid.extend(array('i', [NO_NODE]) * (n + 1 - len(self._nid)))
+        self._nid[n] = nid
+        if nodes is None:
+            nodes = self._nodes[nid] = set(); norm = self._norm[nid] = normalize(self.store.strings[nid])
+            for g in grams(norm):
+                self._grams.setdefault(g, set()).add(nid); d = self._dense.get(g)
+                if d is not None:
+                    if nid >= len(d): d.extend(bytes(nid + 1 - len(d)))
+                    d[nid] = 1
+            self._heads.setdefault(norm[:3], set()).add(nid); self._lens.setdefault(len(norm), set()).add(nid)
+        nodes.add(n)
+
+    def _discard(self, n, nid):
+        self._nid[n] = NO_NODE; nodes = self._nodes.get(nid)
+        if nodes is None: return
+        nodes.discard(n)
+        if nodes: return
+        del self._nodes[nid]; self._anc_grams.pop(nid, None); norm = self._norm.pop(nid)
+        for m, k in ((self._heads, norm[:3]), (self._lens, len(norm))):
+            m[k].discard(nid)
+            if not m[k]: del m[k]
+        for g in grams(norm):
+            post = self._grams.get(g)
+            if post is not None:
+                post.discard(nid); d = self._dense.get(g)
+                if d is not None: d[nid] = 0
+                if not post: del self._grams[g]; self._dense.pop(g, None)
+
+    def on_store_change(self, event, n, old):
+        if event not in ("add", "remove", "name"): return
+        with self.lock:
+            if event == "add": self._add(n)
+            elif event == "name": self._discard(n, old); self._add(n)
+            else:
+                for r in old: self._discard(r, self._nid[r])
+
+    # ---------- 查询 ----------
+    def _short_names(self, key, other):
+        """含 key (1~3 个字) 的名称 id，按名称长度升序 (同长度内不排)；other 为假时只要以 key 开头的，为真时只要其余的。
+        先用 _heads / 倒排表得到集合，再逐个长度与 _lens 求交集，都在 C 里做；只有很常见的 1~2 字词才逐个名称判断"""
+        heads = self._heads
+        starts = heads.get(key, set()) if len(key) == 3 else set().union(*(v for h, v in heads.items() if h.startswith(key)))
+        if not other: sel = starts
+        elif len(key) == 3: sel = self._grams.get(key, set()) - starts   # 三个字时倒排表里正好都含它
+        else:
+            posts = [v for g, v in self._grams.items() if key in g]   # 名称里任何不超过三个字的片段都落在它的某个三元组里
+            sel = set().union(*posts) - starts if sum(map(len, posts)) <= SHORT_UNION_MAX else None
+        norm = self._norm
+        for L in sorted(self._lens):
+            names = self._lens[L]
+            if sel is not None: yield from (sel & names)
+            else: yield from (nid for nid in names if key in norm[nid] and not norm[nid].startswith(key))
+
+    def _path_best(self, p, terms, tgs, memo):
+        """p 及其各级祖先里，每个上级路径词的最佳匹配分 (包含即 1，否则三元组 Dice)；本次查询内按节点记忆。
+        名称取索引自己登记的 _nid：store 先改 name_id 再通知监听器，搜索线程在两者之间读到的新 id 可能还不在 _norm 里"""
+        s = self.store; chain = []
+        while p != ROOT and p not in memo: chain.append(p); p = s.parent[p]
+        best = memo[p] if p != ROOT else (0.0,) * len(terms)
+        for a in reversed(chain):
+            nid = self._nid[a]; name = self._norm[nid]; ag = None; row = []
+            for t, tg, b in zip(terms, tgs, best):
+                if b < 1.0:
+                    if t in name: b = 1.0
+                    elif tg:
+                        if ag is None:
+                            ag = self._anc_grams.get(nid)
+                            if ag is None: ag = self._anc_grams[nid] = grams(name)
+                        b = max(b, 2.0 * len(tg & ag) / (len(tg) + len(ag) or 1))
+                row.append(b)
+            best = memo[a] = tuple(row)
+        return best
+
+    def _path_score(self, n, terms, tgs, memo):
+        """上级路径词必须出现在某个祖先名称里 (允许轻微错字)，返回乘积分数，0 表示不符"""
+        total = 1.0
+        for b in self._path_best(self.store.parent[n], terms, tgs, memo):
+            if b < 0.5: return 0.0
+            total *= b
+        return total
+
+    def _collect(self, items, path, limit, heap, bound=False):
+        """items 为 (名称分, name_id)；逐个节点乘上路径分 (不超过 1) 后放进容量 limit 的小顶堆 (分数, -节点)。
+        path 为 (上级路径词, 其三元组, 本次查询的祖先记忆) 或 None；
+        bound 表示 items 按名称分降序，堆满且名称分不及堆顶即可提前结束。返回看过的名称数"""
+        seen = 0
+        for sc, nid in items:
+            if bound and len(heap) >= limit and sc < heap[0][0]: break
+            seen += 1
+            for n in self._nodes[nid]:
+                if path:
+                    ps = self._path_score(n, *path)
+                    if not ps: continue
+                    e = (sc * ps, -n)
+                else: e = (sc, -n)
+                if len(heap) < limit: heapq.heappush(heap, e)
+                elif e > heap[0]: heapq.heapreplace(heap, e)
+        return seen
+
+    def _by_length(self, term, nids, prefix, path, limit, heap):
+        """nids 的名称都含 term 且按长度升序：分数 1 + 词长/名称长 (+0.2 前缀命中) 随长度单调下降，
+        所以堆满后一旦当前分数不及堆顶，后面的都不必再看"""
+        norm = self._norm; L = len(term); bonus = 0.2 if prefix else 0.0
+        return self._collect(((1.0 + L / len(norm[nid]) + bonus, nid) for nid in nids), path, limit, heap, bound=True)
+
+    def _search_short(self, term, path, limit, heap):
+        """1~3 个字：含该词的名称可能很多，只按名称长度从短到长走到凑满为止"""
+        return sum(self._by_length(term, self._short_names(term, other), not other, path, limit, heap) for other in (False, True))
+
+    def _search_long(self, term, path, limit, heap):
+        """包含查询词的名称必含它的全部三元组 (对最稀有的几张表求交集)，分数都在 1 以上；
+        不够 limit 条时再按三元组 Dice 系数补上相近的名称 (分数不超过 1)"""
+        norm = self._norm
+        q = sorted(grams(term), key=lambda g: len(self._grams.get(g, ())))
+        posts = [self._grams.get(g) for g in q]
+        contains = set(); seen = 0
+        if all(posts):
+            contains = {nid for nid in posts[0].intersection(*posts[1:]) if term in norm[nid]}
+            groups = ([], [])
+            for nid in contains: v = norm[nid]; groups[not v.startswith(term)].append((len(v) << 32) | nid)
+            for prefix, codes in zip((True, False), groups):
+                codes.sort(); seen += self._by_length(term, (code & 0xFFFFFFFF for code in codes), prefix, path, limit, heap)
+        if len(heap) >= limit: return seen
+        return seen + self._collect(self._dice(q[:MAX_GRAMS], contains), path, limit, heap)
+
+    def _dice(self, q, skip):
+        """至少含 q 中一半三元组的名称 (跳过 skip)，产出 (三元组 Dice 系数, name_id)，不低于 MIN_SCORE。
+        每个名称命中几个三元组用“每个名称一个字节”来数：常见三元组的 _dense 字节数组当作大整数相加即逐字节计数
+        (不超过 255 个不会进位)，稀少的在临时字节数组上逐个加；再用 translate 挑出够数的位置。
+        常见三元组的倒排表动辄上万，这样不必对共享少数三元组的大量名称逐个核对"""
+        norm = self._norm; nq = len(q); need = max(1, ceil(nq * 0.5))
+        size = len(self.store.strings); acc = bytearray(size); total = 0   # name_id 是字符串表下标
+        for g in q:
+            post = self._grams.get(g)
+            if not post: continue
+            if len(post) < size >> DENSE_SHIFT:
+                for nid in post: acc[nid] += 1
+                continue
+            d = self._dense.get(g)
+            if d is None:
+                d = self._dense[g] = bytearray(size)
+                for nid in post: d[nid] = 1
+            total += int.from_bytes(d, 'little')
+        counts = (total + int.from_bytes(acc, 'little')).to_bytes(size, 'little')
+        for m in re.finditer(b'\x01', counts.translate(bytes(v >= need for v in range(256)))):
+            nid = m.start()
+            if nid in skip: continue
+            sc = 2.0 * counts[nid] / (nq + max(1, len(norm[nid]) - 2))
+            if sc >= MIN_SCORE: yield sc, nid
+
+    def search(self, query, limit=50):
+        """返回前 limit 条结果：[{node, score, name, path, spans}]，分数高者在前"""
+        raw_terms = [t for t in _SPLIT.split(query) if t.strip()]
+        terms = [normalize(t) for t in raw_terms]
+        if not terms: return []
+        leaf, path_terms = terms[-1], terms[:-1]; s = self.store
+        with prof.span("search"), self.lock:
+            heap = []; path = (path_terms, [grams(t) for t in path_terms], {}) if path_terms else None
+            if len(leaf) <= 3: seen = self._search_short(leaf, path, limit, heap)   # 三个字时 Dice 候选也都含查询词，没有可补的
+            else: seen = self._search_long(leaf, path, limit, heap)
+            prof.count("candidates_scored", seen)
+            top = sorted(heap, reverse=True)   # 同分时先出现的节点在前
+        results = []
+        for sc, neg in top:
+            n = -neg
+            name = s.name(n)
+            results.append({"node": n, "score": sc, "name": name, "path": s.full_path(n), "spans": highlight_spans(name, raw_terms[-1])})
+        return results
@@ -0,0 +1,173 @@
+"""无界面自检 (脚本，不依赖 Qt)：项目文件格式、修改日志回放、合并后日志重写、三方合并冲突
+
+    python category_selftest.py              # 全部检查
+    python category_selftest.py --only merge # 只跑名称包含此串的检查
+
+每项检查在独立的临时目录里自建小树，不读仓库里的数据文件。有检查失败时退出码为 1。
+"""
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+import traceback
+
+from category_core import CategoryStore, ROOT
+from category_project import (save_project_file, load_project_file, data_fingerprint, journal_path, ChangeJournal,
+                              replay_journal, JournalMismatch)
+from category_sync import compute_hashes, merge_remote, diff_ops
+
+DEEP_CHAIN = 3000   # 远超标准库 json 的递归上限
+
+
+class CheckFailed(Exception):
+    pass
+
+
+def check(cond, msg):
+    if not cond: raise CheckFailed(msg)
+
+
+def make_store():
+    """几层目录 + 转义字符、收藏、备注、展开、同名兄弟，各种字段都有"""
+    s = CategoryStore()
+    for i in range(3):
+        top = s.add_node(ROOT, f"Top {i}", is_folder=True, expanded=i == 0)
+        for j in range(4):
+            mid = s.add_node(top, f"Mid {i}.{j}", is_folder=True)
+            for k in range(3): s.add_node(mid, f"Leaf {i}.{j}.{k}", f"C{i}/{j}{k}" if k else "", "备注" if j == k else "", fav=k == 2)
+    s.add_node(ROOT, 'q"\\\n\t é\x01', "c/1", "rÿ", fav=True, expanded=True)
+    s.add_node(ROOT, "Dup"); s.add_node(ROOT, "Dup", "D/2")
+    return s
+
+
+def same(a, b): return compute_hashes(a)[ROOT] == compute_hashes(b)[ROOT] and a.expanded_nodes == b.expanded_nodes
+
+
+def same_content(a, b):
+    """日志回放的比较：展开状态不记日志；合并与回放新增的节点都追加在末尾，兄弟顺序可能与合并时不同，只比路径和字段"""
+    def rows(s): return sorted((s.full_path(n), s.code(n), s.remark(n), s.fav[n], s.is_folder[n]) for n in s.nodes())
+    return rows(a) == rows(b)
+
+
+def find(store, path):
+    n = ROOT
+    for part in path.split("/"):
+        n = next((c for c in store.children(n) if store.name(c) == part), None)
+        check(n is not None, f"找不到 {path}")
+    return n
+
+
+def read_fp(path):
+    with open(path, 'rb') as f: return data_fingerprint(f.read())
+
+
+def open_project(path):
+    """与界面打开项目相同：载入快照、回放日志、挂上日志继续记录"""
+    store = load_project_file(path); fp = read_fp(path); jp = journal_path(path)
+    replayed = replay_journal(store, jp, fp); journal = ChangeJournal(jp, fp); journal.attach(store)
+    return store, fp, journal, replayed
+
+
+# ---------- 检查 ----------
+def check_roundtrip(d):
+    """二进制 <-> JSON 互转内容不变，保存返回的指纹与磁盘上的一致，覆盖保存不改文件权限；几千层的链也能存取"""
+    s = make_store(); b1, j1, b2 = (os.path.join(d, x) for x in ("a.hdproj", "a.json", "b.hdproj"))
+    check(save_project_file(s, b1) == read_fp(b1), "二进制指纹与文件不符")
+    from_bin = load_project_file(b1); check(same(s, from_bin), "二进制读回不一致")
+    check(save_project_file(from_bin, j1) == read_fp(j1), "JSON 指纹与文件不符")
+    from_json = load_project_file(j1); check(same(s, from_json), "JSON 读回不一致")
+    save_project_file(from_json, b2); check(read_fp(b1) == read_fp(b2), "二进制 -> JSON -> 二进制 字节不同")
+    if os.name == "posix":   # 覆盖保存保留原文件权限
+        os.chmod(b2, 0o664); save_project_file(s, b2); check(os.stat(b2).st_mode & 0o777 == 0o664, "保存后文件权限变了")
+    deep = CategoryStore(); p = ROOT
+    for i in range(DEEP_CHAIN): p = deep.add_node(p, f"L{i}", is_folder=True)
+    for ext in (".hdproj", ".json"):
+        path = os.path.join(d, "deep" + ext); save_project_file(deep, path)
+        check(same(deep, load_project_file(path)), f"{DEEP_CHAIN} 层的链 {ext} 读回不一致")
+
+
+def check_journal_replay(d):
+    """未保存就崩溃：重新打开时按日志回放出同样的树；全量保存后继续记录 (id 重新映射) 也能回放；写了一半的末行忽略"""
+    path = os.path.join(d, "p.hdproj"); save_project_file(make_store(), path)
+    s, fp, j, _ = open_project(path)
+    leaf = find(s, "Top 0/Mid 0.1/Leaf 0.1.1"); s.set_code(leaf, "NEW/1"); s.set_remark(leaf, "改过"); s.set_fav(leaf, True)
+    s.set_name(find(s, "Top 1"), "Top One"); s.remove(find(s, "Top 2/Mid 2.0"))
+    n = s.add_node(find(s, "Top 0"), "Added", "A/1", is_folder=True); s.add_node(n, "Added kid", "A/2")
+    j.flush(); j.detach()   # 崩溃：项目文件没有保存
+    s2, _, j2, replayed = open_project(path); j2.detach()
+    check(replayed > 0, "日志为空"); check(same_content(s, s2), "回放结果与崩溃前不一致")
+
+    ids = s.preorder_ids(); fp = save_project_file(s, path); j.attach(s); j.reset(fp, ids)   # 全量保存后 id 与快照编号不再相同
+    s.remove(find(s, "Top 0/Mid 0.0")); s.add_node(find(s, "Top One/Mid 1.3"), "After save", "S/1"); s.set_code(find(s, "Dup"), "D/1")
+    j.flush(); j.detach()
+    with open(journal_path(path), 'a', encoding='utf-8') as f: f.write('{"op": "code", "n": 3, "v": "半')   # 写到一半断电
+    s3, _, j3, _ = open_project(path); j3.detach()
+    check(same_content(s, s3), "全量保存后的日志回放不一致")
+
+    save_project_file(make_store(), path)   # 同事覆盖了项目文件：日志基准对不上
+    try: replay_journal(load_project_file(path), journal_path(path), read_fp(path)); check(False, "基准不符时没有报 JournalMismatch")
+    except JournalMismatch: pass
+
+
+def check_rebase(d):
+    """合并远端保存后用 diff_ops 重写日志：之后崩溃，按新快照回放仍得到合并后的本地树"""
+    path = os.path.join(d, "r.hdproj"); save_project_file(make_store(), path)
+    local, fp, j, _ = open_project(path); base = load_project_file(path)
+    local.set_code(find(local, "Top 0/Mid 0.0/Leaf 0.0.0"), "L/1"); local.add_node(find(local, "Top 1"), "Local new", "L/2")
+    local.remove(find(local, "Top 2/Mid 2.3"))
+    remote, _, rj, _ = open_project(path); rj.detach()
+    remote.set_code(find(remote, "Top 1/Mid 1.0/Leaf 1.0.1"), "R/1"); remote.add_node(find(remote, "Top 0"), "Remote new", "R/2")
+    remote.remove(find(remote, "Top 2/Mid 2.1")); remote.set_name(find(remote, "Top 1/Mid 1.2"), "Mid 1.2 renamed")
+    rfp = save_project_file(remote, path); remote = load_project_file(path)
+
+    j.flush(); j.detach()   # 合并进来的是远端状态，不记入本地日志 (同界面的 sync_from_disk)
+    rh = compute_hashes(remote)
+    stats, conflicts = merge_remote(local, compute_hashes(local), base, compute_hashes(base), remote, rh)
+    check(not conflicts, f"不该有冲突: {conflicts}"); check(stats["added"] and stats["removed"] and stats["updated"], f"合并统计不对: {stats}")
+    for p in ("Top 0/Remote new", "Top 1/Local new", "Top 1/Mid 1.2 renamed"): find(local, p)
+    check(local.code(find(local, "Top 1/Mid 1.0/Leaf 1.0.1")) == "R/1", "远端编码没有合并进来")
+    ops, ids, next_id = diff_ops(local, compute_hashes(local), remote, rh); j.rebase(rfp, local, ids, next_id, ops)
+    local.set_remark(find(local, "Top 1/Local new"), "合并之后"); local.add_node(find(local, "Top 0/Remote new"), "Under remote", "L/3")
+    j.flush(); j.detach()
+    s2, _, j2, _ = open_project(path); j2.detach()
+    check(same_content(local, s2), "重写日志后回放不一致")
+
+
+def check_conflict(d):
+    """两边改了同一节点的同一字段、或远端删了本地改过的节点：保留本地并列为冲突"""
+    base = make_store(); local, remote = base.snapshot(), base.snapshot()
+    leaf = find(base, "Top 0/Mid 0.2/Leaf 0.2.1")
+    local.set_code(leaf, "LOCAL"); remote.set_code(leaf, "REMOTE"); remote.set_remark(leaf, "远端备注")
+    gone = find(base, "Top 1/Mid 1.1/Leaf 1.1.2"); local.set_code(gone, "KEEP"); remote.remove(find(remote, "Top 1/Mid 1.1"))
+    stats, conflicts = merge_remote(local, compute_hashes(local), base, compute_hashes(base), remote, compute_hashes(remote))
+    by_field = {(c["path"], c["field"]): c for c in conflicts}
+    c = by_field.get(("Top 0/Mid 0.2/Leaf 0.2.1", "code"))
+    check(c is not None and c["local"] == "LOCAL" and c["remote"] == "REMOTE", f"编码冲突没有报出: {conflicts}")
+    check(local.code(leaf) == "LOCAL", "冲突时没有保留本地编码"); check(local.remark(leaf) == "远端备注", "不冲突的远端备注没有合并")
+    check(any(p.startswith("Top 1/Mid 1.1") and f == "deleted" for p, f in by_field), f"删除冲突没有报出: {conflicts}")
+    check(local.alive[gone] and local.code(gone) == "KEEP", "远端删除时丢了本地修改")
+
+
+CHECKS = [("roundtrip", check_roundtrip), ("journal", check_journal_replay), ("rebase", check_rebase), ("merge-conflict", check_conflict)]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="类目工具无界面自检")
+    ap.add_argument("--only", help="只跑名称包含此串的检查"); ap.add_argument("-v", "--verbose", action="store_true", help="失败时打印堆栈")
+    args = ap.parse_args(argv)
+    failed = 0
+    for name, fn in CHECKS:
+        if args.only and args.only not in name: continue
+        d = tempfile.mkdtemp(prefix="catcheck-")
+        try: fn(d); print(f"  {name:<16} OK")
+        except Exception as e:
+            failed += 1; print(f"  {name:<16} 失败: {type(e).__name__}: {e}")
+            if args.verbose: traceback.print_exc()
+        finally: shutil.rmtree(d, ignore_errors=True)
+    if failed: print(f"{failed} 项检查失败")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""子树哈希与三方合并 (无 GUI 依赖)：项目文件被别人改了之后只修补真正变化的子树
+
+每个节点的哈希 = H(名称, 编码, 备注, 收藏, 文件夹, 各子节点哈希)，保存/加载时对快照算一遍。
+同级节点按名称配对 (同名按出现次序)，所以改名等价于删掉旧节点再新增一个。
+三方：base 为本地上次加载/保存时的快照，local 为当前内存中的树，remote 为磁盘上的新文件。
+"""
+import hashlib
+from array import array
+
+from category_core import ROOT
+from category_profile import PROFILER as prof
+
+FIELDS = ("code", "remark", "fav", "is_folder")
+
+
+def compute_hashes(store):
+    """后序计算每个存活节点的子树哈希，返回按节点 id 下标的列表 (已删除节点为 None)"""
+    hashes = [None] * store.capacity(); first, nxt = store.first_child, store.next_sibling
+    with prof.span("sync.hash"):
+        order = list(store.iter_subtree(ROOT))
+        for n in reversed(order):
+            h = hashlib.blake2b(digest_size=16)
+            h.update(f"{store.name(n)}\x1f{store.code(n)}\x1f{store.remark(n)}\x1f{store.fav[n]}{store.is_folder[n]}\x1e".encode())
+            c = first[n]
+            while c != -1: h.update(hashes[c]); c = nxt[c]
+            hashes[n] = h.digest()
+        prof.count("nodes_visited", len(order))
+    return hashes
+
+
+def field(store, n, f):
+    if f == "code": return store.code(n)
+    if f == "remark": return store.remark(n)
+    return (store.fav if f == "fav" else store.is_folder)[n]
+
+
+def _keyed(store, n):
+    """{(名称, 同名序号): 子节点}，保持原顺序"""
+    out = {}; seen = {}
+    if n is None: return out
+    for c in store.children(n):
+        name = store.name(c); k = seen.get(name, 0); seen[name] = k + 1; out[(name, k)] = c
+    return out
+
+
+class StoreApplier:
+    """合并时对本地树的修改入口；界面层可以子类化，改成经由模型插入/删除行"""
+    def __init__(self, store): self.store = store
+
+    def set(self, n, f, v):
+        s = self.store
+        if f == "code": s.set_code(n, v)
+        elif f == "remark": s.set_remark(n, v)
+        elif f == "fav": s.set_fav(n, v)
+        else: s.set_folder(n, v)
+
+    def add(self, parent, src, m):
+        """在 parent 下新增一个与 src 中节点 m 相同的节点 (不含子节点)，返回新 id"""
+        return self.store.add_node(parent, src.name(m), src.code(m), src.remark(m), src.fav[m], src.is_folder[m])
+
+    def add_subtree(self, parent, src, m):
+        top = self.add(parent, src, m); ids = {m: top}; s = self.store
+        for x in src.iter_subtree(m, False):
+            ids[x] = s.add_node(ids[src.parent[x]], src.name(x), src.code(x), src.remark(x), src.fav[x], src.is_folder[x])
+        return top
+
+    def remove(self, n): self.store.remove(n)
+
+
+def merge_remote(local, lh, base, bh, remote, rh, applier=None):
+    """把 remote 相对 base 的变化合并进 local。两边都改了同一处时保留本地值并记为冲突。
+    lh/bh/rh 为 compute_hashes 的结果；返回 (统计, 冲突列表)，冲突项 {"path", "field", "local", "remote"}"""
+    applier = applier or StoreApplier(local)
+    stats = {"updated": 0, "added": 0, "removed": 0}; conflicts = []
+    with prof.span("sync.merge"): _merge(local, lh, base, bh, remote, rh, applier, stats, conflicts)
+    return stats, conflicts
+
+
+def _merge(local, lh, base, bh, remote, rh, applier, stats, conflicts):
+    stack = [(ROOT, ROOT, ROOT)]
+    while stack:
+        l, b, r = stack.pop()
+        if lh[l] == rh[r]: continue                      # 两边子树完全相同
+        if b is not None and bh[b] == rh[r]: continue    # 远端没动这棵子树，本地改动原样保留
+        if l != ROOT:
+            for f in FIELDS:
+                lv, rv = field(local, l, f), field(remote, r, f)
+                if lv == rv: continue
+                bv = field(base, b, f) if b is not None else None
+                if b is not None and lv == bv: applier.set(l, f, rv); stats["updated"] += 1
+                elif b is None or rv != bv: conflicts.append({"path": local.full_path(l), "field": f, "local": lv, "remote": rv})
+        lk, bk, rk = _keyed(local, l), _keyed(base, b), _keyed(remote, r)
+        for key in list(rk) + [k for k in lk if k not in rk]:
+            lc, bc, rc = lk.get(key), bk.get(key), rk.get(key)
+            if lc is not None and rc is not None: stack.append((lc, bc, rc))
+            elif rc is not None:
+                if bc is None: applier.add_subtree(l, remote, rc); stats["added"] += 1
+                elif bh[bc] != rh[rc]:
+                    conflicts.append({"path": remote.full_path(rc), "field": "deleted", "local": "本地已删除", "remote": "远端有修改"})
+            elif bc is not None:
+                if lh[lc] == bh[bc]: applier.remove(lc); stats["removed"] += 1
+                else: conflicts.append({"path": local.full_path(lc), "field": "deleted", "local": "本地有修改", "remote": "远端已删除"})
+
+
+def diff_ops(local, lh, remote, rh):
+    """生成把 remote 变成 local 的日志操作 (节点 id 按 remote 的编号，新增节点从 remote.capacity() 起顺延)。
+    返回 (ops, 本地 id -> 快照 id 映射, 下一个新 id)，供合并后重写修改日志"""
+    ids = array('i', [0]) * local.capacity(); next_id = remote.capacity(); ops = []
+    stack = [(ROOT, ROOT)]
+    while stack:
+        l, r = stack.pop(); ids[l] = r
+        if lh[l] == rh[r]:
+            for a, m in zip(local.iter_subtree(l), remote.iter_subtree(r)): ids[a] = m
+            continue
+        if l != ROOT:
+            for f in FIELDS:
+                v = field(local, l, f)
+                if v != field(remote, r, f): ops.append({"op": "folder" if f == "is_folder" else f, "n": r, "v": v})
+        lk, rk = _keyed(local, l), _keyed(remote, r)
+        for key, lc in lk.items():
+            rc = rk.get(key)
+            if rc is not None: stack.append((lc, rc)); continue
+            for x in local.iter_subtree(lc):
+                ids[x] = next_id; next_id += 1
+                ops.append({"op": "add", "n": ids[x], "p": ids[local.parent[x]], "name": local.name(x), "code": local.code(x),
+                            "remark": local.remark(x), "fav": local.fav[x], "folder": local.is_folder[x]})
+        for key, rc in rk.items():
+            if key not in lk: ops.append({"op": "remove", "n": rc})
+    return ops, ids, next_id